@@ -7,6 +7,7 @@ the analyzed skill profile and company modifiers.
 
 import json
 
+import orjson
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from app.agents.state import AgentState
@@ -17,6 +18,18 @@ from app.logging_config import get_logger
 logger = get_logger("agents.capstone_node")
 
 
+def _loads_json(text: str):
+    """Decode with orjson, falling back to json for what it rejects.
+
+    LLMs occasionally emit NaN, Infinity or out-of-range numbers (1e400);
+    json.loads accepts those, orjson does not.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
 async def capstone_generator_node(state: AgentState) -> dict:
     """
     Capstone Generator Agent Node.
@@ -63,7 +76,7 @@ async def capstone_generator_node(state: AgentState) -> dict:
                     raw = raw[:-3]
                 raw = raw.strip()
             try:
-                parsed = json.loads(raw)
+                parsed = _loads_json(raw)
                 break
             except json.JSONDecodeError as e:
                 logger.warning(f"Capstone attempt {attempt + 1}: invalid JSON: {e}")
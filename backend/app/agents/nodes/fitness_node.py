@@ -15,6 +15,9 @@ from app.logging_config import get_logger
 
 logger = get_logger("agents.fitness")
 
+_FENCE_OPEN_RE = re.compile(r"^```(?:json)?\s*")
+_FENCE_CLOSE_RE = re.compile(r"\s*```\s*$")
+
 FITNESS_SYSTEM_PROMPT = """You are an expert technical recruiter and talent assessor with 15+ years of experience evaluating engineering candidates.
 
 Your task: Evaluate how well a candidate's resume matches a specific job description.
@@ -122,8 +125,8 @@ async def fitness_scorer_node(state: AgentState) -> dict:
             raw = response.content.strip()
 
             # Strip markdown fences
-            raw = re.sub(r"^```(?:json)?\s*", "", raw)
-            raw = re.sub(r"\s*```\s*$", "", raw)
+            raw = _FENCE_OPEN_RE.sub("", raw)
+            raw = _FENCE_CLOSE_RE.sub("", raw)
 
             try:
                 result = json.loads(raw)
@@ -17,6 +17,9 @@ from app.logging_config import get_logger
 
 logger = get_logger("agents.jd_node")
 
+_FENCE_OPEN_RE = re.compile(r'^```[a-zA-Z]*\s*')
+_FENCE_CLOSE_RE = re.compile(r'```\s*$')
+
 
 async def jd_analysis_node(state: AgentState) -> dict:
     """
@@ -54,8 +57,8 @@ async def jd_analysis_node(state: AgentState) -> dict:
             raw = response.content.strip()
 
             # Robustly strip markdown fences (```json, ```, etc.)
-            raw = re.sub(r'^```[a-zA-Z]*\s*', '', raw)
-            raw = re.sub(r'```\s*$', '', raw)
+            raw = _FENCE_OPEN_RE.sub('', raw)
+            raw = _FENCE_CLOSE_RE.sub('', raw)
             raw = raw.strip()
 
             # If still not starting with {, try to find the JSON object
@@ -9,6 +9,7 @@ import json
 import time
 from typing import Any
 
+import orjson
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 from app.agents.state import AgentState
@@ -21,6 +22,18 @@ from app.logging_config import get_logger
 
 logger = get_logger("agents.portfolio_node")
 
+
+def _loads_json(text: str):
+    """Parse JSON via orjson, retrying with json.loads on non-standard numbers.
+
+    orjson rejects NaN, Infinity and values beyond double range; json does not.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
 # ── Size Limits ──
 MAX_README_LENGTH = 20_000       # 20 KB
 MAX_BULLET_LENGTH = 300
@@ -44,7 +57,7 @@ def _parse_portfolio_response(raw: str) -> dict:
         text = text.strip()
 
     try:
-        data = json.loads(text)
+        data = _loads_json(text)
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse portfolio JSON: {e}")
         # Try to find JSON object in text
@@ -52,7 +65,7 @@ def _parse_portfolio_response(raw: str) -> dict:
         end = text.rfind("}") + 1
         if start >= 0 and end > start:
             try:
-                data = json.loads(text[start:end])
+                data = _loads_json(text[start:end])
             except json.JSONDecodeError:
                 raise ValueError(f"Invalid JSON in portfolio response: {e}")
         else:
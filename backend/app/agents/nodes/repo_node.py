@@ -8,6 +8,7 @@ Uses GitHub API for data collection, LLM for scoring.
 import json
 from typing import Any
 
+import orjson
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from app.agents.state import AgentState
@@ -19,6 +20,14 @@ from app.logging_config import get_logger
 logger = get_logger("agents.repo_node")
 
 
+def _loads_json(text: str):
+    """orjson first; json.loads for the NaN/Infinity/1e400 scores orjson refuses."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
 def _result_to_prompt_args(result: RepoAnalysisResult) -> dict[str, Any]:
     """Convert RepoAnalysisResult to prompt builder args."""
     return {
@@ -55,13 +64,13 @@ def _parse_scorecard(content: str) -> dict:
     
     # Try to find JSON object if surrounded by other text
     try:
-        return json.loads(content)
+        return _loads_json(content)
     except json.JSONDecodeError:
         start = content.find("{")
         end = content.rfind("}") + 1
         if start >= 0 and end > start:
             try:
-                return json.loads(content[start:end])
+                return _loads_json(content[start:end])
             except json.JSONDecodeError:
                 pass
 
@@ -32,6 +32,9 @@ ALLOWED_EXTENSIONS = {
 # Path components that are forbidden (security)
 FORBIDDEN_PATH_PARTS = {"__pycache__", "node_modules", ".git", "..", "~"}
 
+_FENCE_RE = re.compile(r"```(?:json)?\s*\n?(.*?)\n?```", re.DOTALL)
+_PROJECT_NAME_UNSAFE_RE = re.compile(r"[^a-z0-9\-]")
+
 
 def _sanitize_path(path: str) -> str | None:
     """Validate and sanitize a file path. Returns None if invalid."""
@@ -66,7 +69,7 @@ def _parse_scaffold_response(content: str) -> dict:
     """Parse the LLM response into a scaffold dict."""
     # Try to extract JSON from markdown code blocks if present
     cleaned = content.strip()
-    json_match = re.search(r"```(?:json)?\s*\n?(.*?)\n?```", cleaned, re.DOTALL)
+    json_match = _FENCE_RE.search(cleaned)
     if json_match:
         cleaned = json_match.group(1).strip()
 
@@ -110,8 +113,8 @@ def _validate_scaffold(scaffold: dict) -> dict:
         })
 
     # Ensure project_name is safe
-    project_name = re.sub(
-        r"[^a-z0-9\-]", "",
+    project_name = _PROJECT_NAME_UNSAFE_RE.sub(
+        "",
         str(scaffold.get("project_name", "scaffold-project")).lower(),
     )[:80] or "scaffold-project"
 
@@ -12,7 +12,6 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.api.deps import AuthenticatedUser, get_current_user
 from app.schemas.capstone import CapstoneGenerationRequest, CapstoneGenerationResponse, ProjectIdea, ArchitectureOverview
-from app.agents.orchestrator import compile_jd_pipeline
 from app.services.db_service import (
     get_jd_analysis,
     create_capstone_projects,
@@ -100,6 +99,8 @@ async def generate_capstone_projects(
 
     # Step 2: Run the full JD pipeline (JD → Company → Capstone)
     # We supply the original JD so the pipeline can produce capstone projects
+    from app.agents.orchestrator import compile_jd_pipeline
+
     try:
         pipeline = compile_jd_pipeline()
         initial_state = {
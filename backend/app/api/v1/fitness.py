@@ -18,7 +18,6 @@ from app.schemas.fitness import (
     MissingSkill,
     Improvement,
 )
-from app.agents.orchestrator import compile_fitness_pipeline
 from app.services.db_service import (
     get_jd_analysis,
     create_fitness_score,
@@ -129,6 +128,8 @@ async def score_fitness(
         )
 
     # Step 3: Run fitness pipeline
+    from app.agents.orchestrator import compile_fitness_pipeline
+
     try:
         pipeline = compile_fitness_pipeline()
         initial_state = {
@@ -20,7 +20,6 @@ from app.schemas.jd import (
     Skill,
     EngineeringExpectation,
 )
-from app.agents.orchestrator import compile_jd_pipeline
 from app.services.db_service import (
     create_jd_analysis,
     update_jd_analysis,
@@ -179,6 +178,8 @@ async def analyze_jd(
     await update_jd_analysis(analysis_id, user.user_id, status="processing")
 
     # Step 3: Run the LangGraph JD pipeline
+    from app.agents.orchestrator import compile_jd_pipeline
+
     try:
         pipeline = compile_jd_pipeline()
         initial_state = {
@@ -12,7 +12,6 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.api.deps import AuthenticatedUser, get_current_user
-from app.agents.orchestrator import compile_portfolio_pipeline
 from app.schemas.portfolio import PortfolioOptimizeRequest, PortfolioOptimizeResponse
 from app.services.db_service import (
     create_portfolio_output,
@@ -62,6 +61,8 @@ async def optimize_portfolio(
         )
 
     # Run pipeline
+    from app.agents.orchestrator import compile_portfolio_pipeline
+
     try:
         pipeline = compile_portfolio_pipeline()
         initial_state = {
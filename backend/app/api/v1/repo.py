@@ -17,7 +17,6 @@ from app.schemas.repo import (
     RepoScoreCard,
     ScoreDimension,
 )
-from app.agents.orchestrator import compile_repo_pipeline
 from app.services.db_service import (
     create_repo_analysis,
     update_repo_analysis,
@@ -109,6 +108,8 @@ async def analyze_repo(
     await update_repo_analysis(analysis_id, user.user_id, status="processing")
 
     # Step 3: Run the LangGraph repo pipeline
+    from app.agents.orchestrator import compile_repo_pipeline
+
     try:
         pipeline = compile_repo_pipeline()
         initial_state = {
@@ -16,7 +16,6 @@ from app.schemas.scaffold import (
     ScaffoldResponse,
     GeneratedFile,
 )
-from app.agents.orchestrator import compile_scaffold_pipeline
 from app.services.db_service import (
     create_scaffold,
     update_scaffold,
@@ -93,6 +92,8 @@ async def generate_scaffold_endpoint(
         )
 
     # Step 2: Run scaffold pipeline
+    from app.agents.orchestrator import compile_scaffold_pipeline
+
     try:
         await update_scaffold(scaffold_id, user.user_id, status="processing")
 
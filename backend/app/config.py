@@ -23,6 +23,7 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development", pattern="^(development|testing|staging|production)$")
     DEBUG: bool = False
     LOG_LEVEL: str = Field(default="INFO", pattern="^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$")
+    PRELOAD_PIPELINES: bool = True  # import the LangGraph orchestrator at app import
 
     # Security
     SECRET_KEY: str = Field(default_factory=lambda: secrets.token_urlsafe(64))
@@ -60,6 +61,11 @@ class Settings(BaseSettings):
     REPO_MAX_SIZE_MB: int = 500
     TEMP_CLONE_DIR: str = "/tmp/shortlist_repos"
 
+    # Monitoring
+    METRICS_CACHE_ENABLED: bool = True
+    METRICS_CACHE_TTL_SECONDS: float = Field(default=1.0, ge=0.0)
+    METRICS_SAMPLE_RATE: int = Field(default=1, ge=1)  # record 1-in-N request latencies
+
     # Validators
     @field_validator("SUPABASE_URL")
     @classmethod
@@ -1,7 +1,9 @@
 """FastAPI application entry point with lifespan, security middleware, and versioned routing."""
 
+import importlib
+import os
+import re
 import time
-import uuid
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -25,19 +27,34 @@ from app.api.v1 import router as api_v1_router
 logger = get_logger("main")
 
 # Request-ID Tracing Middleware
+
+# Incoming trace ids are opaque, but they are echoed into headers and logs —
+# accept 1–128 URL-safe characters and replace anything else.
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+def _fast_uuid4() -> str:
+    """Random UUID4 string, built from os.urandom without a uuid.UUID object."""
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
 class RequestTracingMiddleware(BaseHTTPMiddleware):
     """
     Assigns a unique X-Request-ID to every request.
     Enables end-to-end tracing across frontend → backend → logs.
 
-    - Respects incoming X-Request-ID from reverse proxy / gateway
+    - Respects a well-formed incoming X-Request-ID from reverse proxy / gateway
     - Falls back to generating a new UUID4
     - Injects into response headers for client correlation
     - Records request metrics (latency, status code)
     """
 
     async def dispatch(self, request: Request, call_next) -> Response:
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        request_id = request.headers.get("x-request-id")
+        if not request_id or not _REQUEST_ID_RE.fullmatch(request_id):
+            request_id = _fast_uuid4()
         request.state.request_id = request_id
 
         start_time = time.time()
@@ -215,5 +232,11 @@ def create_app() -> FastAPI:
 
     return app
 
+# The API routes import the LangGraph orchestrator lazily. Load it here so
+# gunicorn (preload_app) pays for it once before forking workers; test runs
+# set PRELOAD_PIPELINES=false to skip it for auth/validation-only tests.
+if get_settings().PRELOAD_PIPELINES:
+    importlib.import_module("app.agents.orchestrator")
+
 # Create the application instance
 app = create_app()
@@ -1,50 +1,166 @@
 """Monitoring endpoints: health checks, Prometheus metrics, and application info."""
 
+import asyncio
+import itertools
+import threading
 import time
-from collections import defaultdict
-from typing import Optional
+from array import array
+from collections import Counter, defaultdict
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
+
+from hdrh.histogram import HdrHistogram
 
 from app.config import get_settings
 from app.logging_config import get_logger
 
 logger = get_logger("monitoring")
 
+# Latency histograms record whole microseconds in [1 µs, 60 s] at 2 significant
+# digits (≤1% error) — a fixed ~20 KB per endpoint regardless of traffic.
+LATENCY_MIN_US = 1
+LATENCY_MAX_US = 60_000_000
+LATENCY_SIGNIFICANT_FIGURES = 2
+
+STATUS_CODE_SLOTS = 600  # 1xx–5xx
+
+def _new_latency_histogram() -> HdrHistogram:
+    return HdrHistogram(LATENCY_MIN_US, LATENCY_MAX_US, LATENCY_SIGNIFICANT_FIGURES)
+
+def _latency_us(latency_ms: float) -> int:
+    # Clamp so requests slower than the histogram range still count
+    return min(max(int(latency_ms * 1000), 0), LATENCY_MAX_US)
+
+class _EndpointLatency:
+    """
+    One endpoint's latency histogram plus a running count and sum.
+
+    hdrh's get_mean_value() walks every bucket in Python (~10 ms), so the
+    average comes from the running totals instead.
+    """
+
+    __slots__ = ("hist", "count", "total_ms")
+
+    def __init__(self):
+        self.hist = _new_latency_histogram()
+        self.count = 0
+        self.total_ms = 0.0
+
 # Application Metrics — In-Memory Counters
 class ApplicationMetrics:
     """
     Lightweight in-memory metrics collector.
-    
+
+    Per-endpoint latencies live in HdrHistograms, so memory per endpoint is
+    constant and percentiles come from bucket counts instead of a sort.
+
     For production at scale, replace with Prometheus client
     (prometheus_client) or push to Datadog/CloudWatch.
     """
 
-    def __init__(self):
-        self._start_time = time.time()
+    # Touched on every request — slots keep attribute access off a __dict__
+    __slots__ = (
+        "_start_ns",
+        "_request_count",
+        "_error_count",
+        "_status_counts",
+        "_other_status_codes",
+        "_endpoint_latencies",
+        "_pipeline_runs",
+        "_pipeline_errors",
+        "_max_tracked_endpoints",
+        "_sample_rate",
+        "_request_seq",
+        "_cache_ttl_seconds",
+        "_snapshot_cache",
+        "_snapshot_lock",
+    )
+
+    def __init__(self, cache_ttl_seconds: float = 0.0, sample_rate: int = 1):
+        """
+        Args:
+            cache_ttl_seconds: Reuse a computed snapshot for this long.
+                0 disables caching (every call recomputes).
+            sample_rate: Record latency for 1 in N requests. Request and
+                status counters stay exact; endpoint "count" is then the
+                number of sampled requests.
+        """
+        self._start_ns = time.monotonic_ns()
         self._request_count = 0
         self._error_count = 0
-        self._status_codes: dict[int, int] = defaultdict(int)
-        self._endpoint_latencies: dict[str, list[float]] = defaultdict(list)
-        self._pipeline_runs: dict[str, int] = defaultdict(int)
-        self._pipeline_errors: dict[str, int] = defaultdict(int)
-        self._max_tracked_endpoints = 200  
+        # One slot per valid HTTP status; anything else (rare) goes to the dict
+        self._status_counts = array("Q", [0] * STATUS_CODE_SLOTS)
+        self._other_status_codes: dict[int, int] = defaultdict(int)
+        self._endpoint_latencies: dict[str, _EndpointLatency] = {}
+        self._pipeline_runs: Counter[str] = Counter()
+        self._pipeline_errors: Counter[str] = Counter()
+        self._max_tracked_endpoints = 200
+        self._sample_rate = max(1, sample_rate)
+        self._request_seq = itertools.count()
+        self._cache_ttl_seconds = cache_ttl_seconds
+        self._snapshot_cache: Optional[tuple[float, Mapping[str, Any]]] = None  # (monotonic ts, payload)
+        self._snapshot_lock = threading.Lock()
 
     @property
     def uptime_seconds(self) -> float:
-        return time.time() - self._start_time
+        return (time.monotonic_ns() - self._start_ns) / 1e9
+
+    def _count_status(self, status_code: int, n: int = 1) -> None:
+        if 0 <= status_code < STATUS_CODE_SLOTS:
+            self._status_counts[status_code] += n
+        else:
+            self._other_status_codes[status_code] += n
 
     def record_request(self, status_code: int, path: str, latency_ms: float):
         """Record a completed HTTP request."""
         self._request_count += 1
-        self._status_codes[status_code] += 1
+        self._count_status(status_code)
         if status_code >= 500:
             self._error_count += 1
-        if len(self._endpoint_latencies) >= self._max_tracked_endpoints and path not in self._endpoint_latencies:
+        if self._sample_rate > 1 and next(self._request_seq) % self._sample_rate:
             return
 
-        latencies = self._endpoint_latencies[path]
-        latencies.append(latency_ms)
-        if len(latencies) > 1000:
-            self._endpoint_latencies[path] = latencies[-500:]
+        entry = self._endpoint_entry(path)
+        if entry is not None:
+            entry.hist.record_value(_latency_us(latency_ms))
+            entry.count += 1
+            entry.total_ms += latency_ms
+
+    def record_many(self, status_code: int, path: str, latencies_ms: Iterable[float]):
+        """
+        Record a batch of completed requests sharing one status and path.
+
+        Equivalent to calling record_request() per latency, but equal
+        microsecond values are folded into a single histogram update.
+        """
+        latencies_ms = list(latencies_ms)
+        if not latencies_ms:
+            return
+        self._request_count += len(latencies_ms)
+        self._count_status(status_code, len(latencies_ms))
+        if status_code >= 500:
+            self._error_count += len(latencies_ms)
+        if self._sample_rate > 1:
+            latencies_ms = [
+                v for v in latencies_ms
+                if not next(self._request_seq) % self._sample_rate
+            ]
+
+        entry = self._endpoint_entry(path)
+        if entry is not None:
+            for value, count in Counter(map(_latency_us, latencies_ms)).items():
+                entry.hist.record_value(value, count)
+            entry.count += len(latencies_ms)
+            entry.total_ms += sum(latencies_ms)
+
+    def _endpoint_entry(self, path: str) -> Optional[_EndpointLatency]:
+        """The latency entry for path, or None once the endpoint cap is hit."""
+        entry = self._endpoint_latencies.get(path)
+        if entry is None:
+            if len(self._endpoint_latencies) >= self._max_tracked_endpoints:
+                return None
+            entry = self._endpoint_latencies[path] = _EndpointLatency()
+        return entry
 
     def record_pipeline_run(self, pipeline_name: str, success: bool):
         """Record a pipeline execution."""
@@ -52,40 +168,77 @@ class ApplicationMetrics:
         if not success:
             self._pipeline_errors[pipeline_name] += 1
 
-    def snapshot(self) -> dict:
-        """Return a point-in-time metrics snapshot."""
+    def reset(self) -> None:
+        """Clear all counters (uptime is kept) and drop any cached snapshot."""
+        self._request_count = 0
+        self._error_count = 0
+        self._status_counts = array("Q", [0] * STATUS_CODE_SLOTS)
+        self._other_status_codes.clear()
+        self._endpoint_latencies = {}
+        self._pipeline_runs.clear()
+        self._pipeline_errors.clear()
+        with self._snapshot_lock:
+            self._snapshot_cache = None
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """
+        Return a point-in-time metrics snapshot as a read-only mapping.
+
+        With a cache TTL configured, concurrent scrapes within the TTL share
+        one computed payload instead of each re-reading every histogram;
+        the payload is immutable so one caller can't corrupt another's view.
+        """
+        if self._cache_ttl_seconds <= 0:
+            return self._build_snapshot()
+
+        with self._snapshot_lock:
+            now = time.monotonic()
+            cached = self._snapshot_cache
+            if cached is not None and now - cached[0] < self._cache_ttl_seconds:
+                return cached[1]
+            payload = self._build_snapshot()
+            self._snapshot_cache = (now, payload)
+            return payload
+
+    def _build_snapshot(self) -> Mapping[str, Any]:
+        """Compute a snapshot from the live counters."""
         endpoint_stats = {}
-        for path, latencies in self._endpoint_latencies.items():
-            if not latencies:
+        for path, entry in self._endpoint_latencies.items():
+            count = entry.count
+            if not count:
                 continue
-            sorted_lat = sorted(latencies)
-            n = len(sorted_lat)
-            endpoint_stats[path] = {
-                "count": n,
-                "p50_ms": sorted_lat[n // 2],
-                "p95_ms": sorted_lat[int(n * 0.95)],
-                "p99_ms": sorted_lat[int(n * 0.99)],
-                "avg_ms": round(sum(sorted_lat) / n, 2),
-            }
+            pct = entry.hist.get_percentile_to_value_dict([50, 95, 99])
+            endpoint_stats[path] = MappingProxyType({
+                "count": count,
+                "p50_ms": round(pct[50] / 1000, 2),
+                "p95_ms": round(pct[95] / 1000, 2),
+                "p99_ms": round(pct[99] / 1000, 2),
+                "avg_ms": round(entry.total_ms / count, 2),
+            })
 
-        return {
+        request_count = self._request_count
+        error_count = self._error_count
+        return MappingProxyType({
             "uptime_seconds": round(self.uptime_seconds, 1),
-            "total_requests": self._request_count,
-            "total_errors": self._error_count,
+            "total_requests": request_count,
+            "total_errors": error_count,
             "error_rate": (
-                round(self._error_count / self._request_count, 4)
-                if self._request_count > 0 else 0.0
+                round(error_count / request_count, 4)
+                if request_count > 0 else 0.0
             ),
-            "status_codes": dict(self._status_codes),
-            "endpoint_latencies": endpoint_stats,
-            "pipelines": {
-                name: {
+            "status_codes": MappingProxyType({
+                **{code: n for code, n in enumerate(self._status_counts) if n},
+                **self._other_status_codes,
+            }),
+            "endpoint_latencies": MappingProxyType(endpoint_stats),
+            "pipelines": MappingProxyType({
+                name: MappingProxyType({
                     "runs": self._pipeline_runs[name],
-                    "errors": self._pipeline_errors.get(name, 0),
-                }
+                    "errors": self._pipeline_errors[name],
+                })
                 for name in self._pipeline_runs
-            },
-        }
+            }),
+        })
 
 # Singleton metrics instance
 _metrics: Optional[ApplicationMetrics] = None
@@ -94,7 +247,13 @@ def get_metrics() -> ApplicationMetrics:
     """Get or create the global metrics instance."""
     global _metrics
     if _metrics is None:
-        _metrics = ApplicationMetrics()
+        settings = get_settings()
+        _metrics = ApplicationMetrics(
+            cache_ttl_seconds=(
+                settings.METRICS_CACHE_TTL_SECONDS if settings.METRICS_CACHE_ENABLED else 0.0
+            ),
+            sample_rate=settings.METRICS_SAMPLE_RATE,
+        )
     return _metrics
 
 # Deep Health Check
@@ -107,10 +266,10 @@ async def check_database_health() -> dict:
 
     try:
         db = get_supabase()
-        start = time.time()
+        start_ns = time.monotonic_ns()
         # Simple existence check — minimal overhead
         result = await db.table("jd_analyses").select("id", count="exact").limit(1).execute()
-        latency_ms = round((time.time() - start) * 1000, 2)
+        latency_ms = round((time.monotonic_ns() - start_ns) / 1e6, 2)
         return {
             "status": "healthy",
             "latency_ms": latency_ms,
@@ -159,8 +318,11 @@ async def deep_health_check() -> dict:
     settings = get_settings()
     metrics = get_metrics()
 
-    db_health = await check_database_health()
-    llm_health = await check_llm_health()
+    # Independent checks — run concurrently so latency is max(), not sum()
+    db_health, llm_health = await asyncio.gather(
+        check_database_health(),
+        check_llm_health(),
+    )
 
     # Overall status: healthy only if all critical components are up
     components_healthy = (
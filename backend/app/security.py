@@ -208,6 +208,10 @@ class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
         return await call_next(request)
 
 # Input Sanitization Utilities
+_WHITESPACE_RE = re.compile(r"\s+")
+# Strict pattern: only github.com repos
+_GITHUB_REPO_URL_RE = re.compile(r"^https://github\.com/[a-zA-Z0-9._-]+/[a-zA-Z0-9._-]+/?$")
+
 def sanitize_string(value: str, max_length: int = 10_000) -> str:
     """
     Sanitize user input:
@@ -220,7 +224,7 @@ def sanitize_string(value: str, max_length: int = 10_000) -> str:
         return ""
     value = value.strip()[:max_length]
     value = value.replace("\x00", "")
-    value = re.sub(r"\s+", " ", value)  # Collapse multiple whitespace
+    value = _WHITESPACE_RE.sub(" ", value)  # Collapse multiple whitespace
     return value
 
 def validate_github_url(url: str) -> str:
@@ -230,9 +234,7 @@ def validate_github_url(url: str) -> str:
     """
     url = sanitize_string(url, max_length=500).strip().rstrip("/")
 
-    # Strict pattern: only github.com repos
-    pattern = r"^https://github\.com/[a-zA-Z0-9._-]+/[a-zA-Z0-9._-]+/?$"
-    if not re.match(pattern, url):
+    if not _GITHUB_REPO_URL_RE.match(url):
         raise ValueError(
             "Invalid GitHub URL. Must be: https://github.com/{owner}/{repo}"
         )
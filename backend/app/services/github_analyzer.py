@@ -18,6 +18,8 @@ logger = get_logger("services.github_analyzer")
 # GitHub API base URL
 GITHUB_API = "https://api.github.com"
 
+_GITHUB_URL_PARTS_RE = re.compile(r"https://github\.com/([^/]+)/([^/]+)/?$")
+
 # File extensions we care about for analysis
 CODE_EXTENSIONS = {
     ".py", ".js", ".ts", ".jsx", ".tsx", ".java", ".go", ".rs", ".rb",
@@ -95,7 +97,7 @@ class RepoAnalysisResult:
 def _parse_github_url(url: str) -> tuple[str, str]:
     """Extract owner and repo name from GitHub URL. Raises ValueError if invalid."""
     url = validate_github_url(url)
-    match = re.match(r"https://github\.com/([^/]+)/([^/]+)/?$", url)
+    match = _GITHUB_URL_PARTS_RE.match(url)
     if not match:
         raise ValueError(f"Invalid GitHub URL format: {url}")
     return match.group(1), match.group(2)
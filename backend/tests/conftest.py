@@ -6,6 +6,7 @@ Provides reusable fixtures for the test suite.
 
 import os
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 
@@ -18,14 +19,60 @@ os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret-for-tests-only")
 os.environ.setdefault("GROQ_API_KEY", "gsk_test_key_for_testing_only")
 os.environ.setdefault("ENVIRONMENT", "testing")
 os.environ.setdefault("ALLOWED_ORIGINS", "http://localhost:3000")
+# Don't preload LangGraph at app import; pipeline tests import it directly
+os.environ.setdefault("PRELOAD_PIPELINES", "false")
 
-from app.main import app  # noqa: E402
 
+# ----- Opt-in slow tests -----
 
-@pytest.fixture
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-slow",
+        action="store_true",
+        default=False,
+        help="Also run tests marked @pytest.mark.slow",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip @pytest.mark.slow tests unless --run-slow is given."""
+    if config.getoption("--run-slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="slow test: pass --run-slow to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session")
 def client():
-    """Synchronous test client."""
-    return TestClient(app)
+    """
+    Synchronous test client, shared across the session.
+
+    Entering the context manager runs the app lifespan once and keeps a
+    single anyio portal open, instead of spinning one up per request.
+    The app import is deferred so narrow runs that never request this
+    fixture skip FastAPI/LangGraph startup entirely.
+    """
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_client():
+    """
+    Async client over ASGITransport, shared across the session.
+
+    Async tests run on the session loop by default (pytest.ini), so the
+    client and the tests awaiting it share one event loop.
+    """
+    from httpx import AsyncClient, ASGITransport
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
 
 
 @pytest.fixture
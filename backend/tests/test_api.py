@@ -2,140 +2,143 @@
 Shortlist — API Endpoint Tests
 
 Tests for the FastAPI application endpoints.
-Uses TestClient for synchronous testing.
+Uses the session-scoped TestClient from conftest.py.
 """
 
-import pytest
-from fastapi.testclient import TestClient
-
-from app.main import app
+import json
 
-
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+import pytest
+from fastapi.middleware.cors import CORSMiddleware
 
 
 class TestHealthCheck:
     """Tests for the /health endpoint."""
 
-    def test_health_returns_200(self, client):
+    def test_health(self, client):
         response = client.get("/health")
         assert response.status_code == 200
 
-    def test_health_returns_status(self, client):
-        response = client.get("/health")
         data = response.json()
         assert data["status"] == "healthy"
         assert "version" in data
         assert "environment" in data
 
-    def test_health_has_security_headers(self, client):
-        response = client.get("/health")
         assert response.headers.get("X-Content-Type-Options") == "nosniff"
         assert response.headers.get("X-Frame-Options") == "DENY"
         assert response.headers.get("X-XSS-Protection") == "1; mode=block"
 
 
+async def _unreachable_app(scope, receive, send):
+    raise AssertionError("CORS preflight should be answered by the middleware")
+
+
+async def _preflight(origin: str) -> dict[str, str]:
+    """Run an OPTIONS preflight through the app's CORSMiddleware alone.
+
+    Rebuilds the middleware from the app's registered config and calls it
+    with a synthetic ASGI scope, skipping routing and the rest of the stack.
+    """
+    from app.main import app
+
+    cors = next(m for m in app.user_middleware if m.cls is CORSMiddleware)
+    middleware = CORSMiddleware(_unreachable_app, *cors.args, **cors.kwargs)
+
+    scope = {
+        "type": "http",
+        "method": "OPTIONS",
+        "path": "/health",
+        "query_string": b"",
+        "headers": [
+            (b"origin", origin.encode()),
+            (b"access-control-request-method", b"GET"),
+        ],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    return {k.decode().lower(): v.decode() for k, v in start["headers"]}
+
+
 class TestCORS:
     """Tests for CORS configuration."""
 
-    def test_cors_allows_configured_origin(self, client):
-        response = client.options(
-            "/health",
-            headers={
-                "Origin": "http://localhost:3000",
-                "Access-Control-Request-Method": "GET",
-            },
-        )
-        assert response.headers.get("access-control-allow-origin") == "http://localhost:3000"
-
-    def test_cors_blocks_unknown_origin(self, client):
-        response = client.options(
-            "/health",
-            headers={
-                "Origin": "http://evil.com",
-                "Access-Control-Request-Method": "GET",
-            },
-        )
+    async def test_cors_allows_configured_origin(self):
+        headers = await _preflight("http://localhost:3000")
+        assert headers.get("access-control-allow-origin") == "http://localhost:3000"
+
+    async def test_cors_blocks_unknown_origin(self):
+        headers = await _preflight("http://evil.com")
         # Unknown origins should not get CORS headers
-        assert response.headers.get("access-control-allow-origin") != "http://evil.com"
+        assert headers.get("access-control-allow-origin") != "http://evil.com"
+
+
+# ─── Request payloads (serialized once at import) ───
+
+_JSON_HEADERS = {"content-type": "application/json"}
+_AUTH_JSON_HEADERS = {**_JSON_HEADERS, "Authorization": "Bearer fake-token"}
+
+_JD_PAYLOAD = json.dumps({
+    "jd_text": "x" * 100,
+    "role": "Backend Engineer",
+    "company_type": "startup",
+}).encode()
+_CAPSTONE_PAYLOAD = json.dumps({"analysis_id": "test-id"}).encode()
+_REPO_PAYLOAD = json.dumps({"github_url": "https://github.com/test/repo"}).encode()
+_SCAFFOLD_PAYLOAD = json.dumps({
+    "project_title": "Test Project",
+    "project_description": "A test project description here",
+}).encode()
+_PORTFOLIO_PAYLOAD = json.dumps({
+    "project_title": "Test",
+    "project_description": "A test project description here",
+}).encode()
+
+_JD_SHORT_TEXT_PAYLOAD = json.dumps({
+    "jd_text": "too short",
+    "role": "Engineer",
+    "company_type": "startup",
+}).encode()
+_JD_INVALID_COMPANY_PAYLOAD = json.dumps({
+    "jd_text": "x" * 100,
+    "role": "Engineer",
+    "company_type": "invalid_type",
+}).encode()
+_REPO_GITLAB_PAYLOAD = json.dumps({"github_url": "https://gitlab.com/user/repo"}).encode()
 
 
 class TestAuthRequiredEndpoints:
     """Tests that protected endpoints require authentication."""
 
-    def test_jd_analyze_requires_auth(self, client):
-        response = client.post("/api/v1/jd/analyze", json={
-            "jd_text": "x" * 100,
-            "role": "Backend Engineer",
-            "company_type": "startup",
-        })
-        assert response.status_code == 401
-
-    def test_capstone_generate_requires_auth(self, client):
-        response = client.post("/api/v1/capstone/generate", json={
-            "analysis_id": "test-id",
-        })
-        assert response.status_code == 401
-
-    def test_repo_analyze_requires_auth(self, client):
-        response = client.post("/api/v1/repo/analyze", json={
-            "github_url": "https://github.com/test/repo",
-        })
-        assert response.status_code == 401
-
-    def test_scaffold_generate_requires_auth(self, client):
-        response = client.post("/api/v1/scaffold/generate", json={
-            "project_title": "Test Project",
-            "project_description": "A test project description here",
-        })
-        assert response.status_code == 401
-
-    def test_portfolio_optimize_requires_auth(self, client):
-        response = client.post("/api/v1/portfolio/optimize", json={
-            "project_title": "Test",
-            "project_description": "A test project description here",
-        })
+    @pytest.mark.parametrize("path,payload", [
+        ("/api/v1/jd/analyze", _JD_PAYLOAD),
+        ("/api/v1/capstone/generate", _CAPSTONE_PAYLOAD),
+        ("/api/v1/repo/analyze", _REPO_PAYLOAD),
+        ("/api/v1/scaffold/generate", _SCAFFOLD_PAYLOAD),
+        ("/api/v1/portfolio/optimize", _PORTFOLIO_PAYLOAD),
+    ], ids=["jd_analyze", "capstone_generate", "repo_analyze", "scaffold_generate", "portfolio_optimize"])
+    def test_requires_auth(self, client, path, payload):
+        response = client.post(path, content=payload, headers=_JSON_HEADERS)
         assert response.status_code == 401
 
 
 class TestInputValidation:
-    """Tests for request validation (Pydantic enforcement)."""
-
-    def test_jd_rejects_short_text(self, client):
-        """JD text under 50 chars should be rejected (auth blocks first with fake token)."""
-        response = client.post(
-            "/api/v1/jd/analyze",
-            json={
-                "jd_text": "too short",
-                "role": "Engineer",
-                "company_type": "startup",
-            },
-            headers={"Authorization": "Bearer fake-token"},
-        )
-        # Auth runs before validation, so we get 401 with fake token
-        assert response.status_code in (401, 422)
-
-    def test_jd_rejects_invalid_company_type(self, client):
-        """Invalid company type should be rejected (auth blocks first with fake token)."""
-        response = client.post(
-            "/api/v1/jd/analyze",
-            json={
-                "jd_text": "x" * 100,
-                "role": "Engineer",
-                "company_type": "invalid_type",
-            },
-            headers={"Authorization": "Bearer fake-token"},
-        )
-        assert response.status_code in (401, 422)
-
-    def test_repo_rejects_invalid_github_url(self, client):
-        """Non-GitHub URLs should be rejected (auth blocks first with fake token)."""
-        response = client.post(
-            "/api/v1/repo/analyze",
-            json={"github_url": "https://gitlab.com/user/repo"},
-            headers={"Authorization": "Bearer fake-token"},
-        )
+    """Tests for request validation (Pydantic enforcement).
+
+    Auth runs before validation, so a fake token yields 401 rather than 422.
+    """
+
+    @pytest.mark.parametrize("path,payload", [
+        ("/api/v1/jd/analyze", _JD_SHORT_TEXT_PAYLOAD),
+        ("/api/v1/jd/analyze", _JD_INVALID_COMPANY_PAYLOAD),
+        ("/api/v1/repo/analyze", _REPO_GITLAB_PAYLOAD),
+    ], ids=["jd_short_text", "jd_invalid_company_type", "repo_invalid_github_url"])
+    def test_rejects_invalid_input(self, client, path, payload):
+        response = client.post(path, content=payload, headers=_AUTH_JSON_HEADERS)
         assert response.status_code in (401, 422)
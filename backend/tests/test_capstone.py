@@ -3,10 +3,12 @@ Shortlist — Capstone Generator Tests
 
 Tests for capstone generation: prompts, node, API, schemas.
 """
-
-import json
+import asyncio
+import math
+import orjson
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import patch
 
 # Schema Tests
 
@@ -116,41 +118,60 @@ class TestCapstonePrompts:
 
 # Capstone Node Tests
 
+_CAPSTONE_PROJECTS_JSON = orjson.dumps({
+    "projects": [
+        {
+            "title": "Real-time Analytics Dashboard",
+            "problem_statement": "Build a real-time data visualization platform.",
+            "recruiter_match_reasoning": "Shows full-stack + data engineering.",
+            "architecture": {
+                "description": "Event-driven with streaming pipeline",
+                "components": ["API", "Stream Processor", "Dashboard"],
+                "data_flow": "Sources → Kafka → Flink → API → React",
+            },
+            "tech_stack": ["Python", "React", "Apache Kafka"],
+            "complexity_level": 4,
+            "estimated_days": 21,
+            "resume_bullet": "Built real-time analytics platform processing 100K events/sec",
+            "key_features": ["Live charts", "Alert rules"],
+            "differentiator": "Production-grade streaming pipeline, not just a chart demo",
+        },
+    ]
+}).decode()
+_CAPSTONE_MOCK_RESPONSE = SimpleNamespace(content=_CAPSTONE_PROJECTS_JSON)
+
+
+class _StubLLM:
+    """Minimal chat-model stand-in: ainvoke returns a canned response or raises."""
+
+    def __init__(self, response=None, error=None):
+        self._response = response
+        self._error = error
+
+    async def ainvoke(self, *args, **kwargs):
+        if self._error is not None:
+            raise self._error
+        return self._response
+
+
+@pytest.mark.slow
 class TestCapstoneNode:
-    """Test the capstone_generator_node."""
-
-    @pytest.fixture
-    def mock_capstone_llm_response(self):
-        projects_json = json.dumps({
-            "projects": [
-                {
-                    "title": "Real-time Analytics Dashboard",
-                    "problem_statement": "Build a real-time data visualization platform.",
-                    "recruiter_match_reasoning": "Shows full-stack + data engineering.",
-                    "architecture": {
-                        "description": "Event-driven with streaming pipeline",
-                        "components": ["API", "Stream Processor", "Dashboard"],
-                        "data_flow": "Sources → Kafka → Flink → API → React",
-                    },
-                    "tech_stack": ["Python", "React", "Apache Kafka"],
-                    "complexity_level": 4,
-                    "estimated_days": 21,
-                    "resume_bullet": "Built real-time analytics platform processing 100K events/sec",
-                    "key_features": ["Live charts", "Alert rules"],
-                    "differentiator": "Production-grade streaming pipeline, not just a chart demo",
-                },
-            ]
-        })
-        mock_resp = MagicMock()
-        mock_resp.content = projects_json
-        return mock_resp
-
-    @pytest.mark.asyncio
-    async def test_capstone_node_success(self, mock_capstone_llm_response):
+    """Test the capstone_generator_node.
+
+    Each test drives a single coroutine, so it runs on one class-scoped loop
+    directly rather than going through pytest-asyncio's dispatch.
+    """
+
+    @pytest.fixture(scope="class")
+    def loop(self):
+        loop = asyncio.new_event_loop()
+        yield loop
+        loop.close()
+
+    def test_capstone_node_success(self, loop):
         from app.agents.nodes.capstone_node import capstone_generator_node
 
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=mock_capstone_llm_response)
+        mock_llm = _StubLLM(response=_CAPSTONE_MOCK_RESPONSE)
 
         state = {
             "skill_profile": {"skills": [{"name": "Python", "weight": 9}]},
@@ -162,20 +183,16 @@ class TestCapstoneNode:
         }
 
         with patch("app.agents.nodes.capstone_node.get_llm", return_value=mock_llm):
-            result = await capstone_generator_node(state)
+            result = loop.run_until_complete(capstone_generator_node(state))
 
         assert result["current_phase"] == "capstone_generation_complete"
         assert len(result["generated_projects"]) == 1
         assert result["generated_projects"][0]["title"] == "Real-time Analytics Dashboard"
 
-    @pytest.mark.asyncio
-    async def test_capstone_node_invalid_json(self):
+    def test_capstone_node_invalid_json(self, loop):
         from app.agents.nodes.capstone_node import capstone_generator_node
 
-        mock_resp = MagicMock()
-        mock_resp.content = "Not valid JSON"
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=mock_resp)
+        mock_llm = _StubLLM(response=SimpleNamespace(content="Not valid JSON"))
 
         state = {
             "skill_profile": {},
@@ -187,18 +204,19 @@ class TestCapstoneNode:
         }
 
         with patch("app.agents.nodes.capstone_node.get_llm", return_value=mock_llm):
-            result = await capstone_generator_node(state)
+            result = loop.run_until_complete(capstone_generator_node(state))
 
         # Should still succeed but with empty projects
         assert result["current_phase"] == "capstone_generation_complete"
         assert result["generated_projects"] == []
 
-    @pytest.mark.asyncio
-    async def test_capstone_node_exception(self):
+    def test_capstone_node_non_finite_numbers(self, loop):
         from app.agents.nodes.capstone_node import capstone_generator_node
 
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(side_effect=RuntimeError("LLM error"))
+        # orjson rejects NaN; the json fallback keeps the projects
+        mock_llm = _StubLLM(response=SimpleNamespace(
+            content='{"projects": [{"title": "Edge Cache", "complexity_level": NaN}]}'
+        ))
 
         state = {
             "skill_profile": {},
@@ -210,52 +228,71 @@ class TestCapstoneNode:
         }
 
         with patch("app.agents.nodes.capstone_node.get_llm", return_value=mock_llm):
-            result = await capstone_generator_node(state)
+            result = loop.run_until_complete(capstone_generator_node(state))
+
+        assert result["current_phase"] == "capstone_generation_complete"
+        assert result["generated_projects"][0]["title"] == "Edge Cache"
+        assert math.isnan(result["generated_projects"][0]["complexity_level"])
+
+    def test_capstone_node_exception(self, loop):
+        from app.agents.nodes.capstone_node import capstone_generator_node
+
+        mock_llm = _StubLLM(error=RuntimeError("LLM error"))
+
+        state = {
+            "skill_profile": {},
+            "company_modifiers": {},
+            "role": "SWE",
+            "company_type": "startup",
+            "messages": [],
+            "errors": [],
+        }
+
+        with patch("app.agents.nodes.capstone_node.get_llm", return_value=mock_llm):
+            result = loop.run_until_complete(capstone_generator_node(state))
 
         assert "capstone_generation_failed" in result["current_phase"]
         assert len(result["errors"]) > 0
 
 # API Tests
 
-class TestCapstoneAPI:
-    """Test capstone API endpoints."""
+# Raw LLM project dicts — _safe_parse_project only reads them, so share one copy.
+_RAW_PROJECT = {
+    "title": "Test Project",
+    "problem_statement": "Test problem",
+    "recruiter_match_reasoning": "Test reasoning",
+    "architecture": {
+        "description": "Test arch",
+        "components": ["A", "B"],
+        "data_flow": "A → B",
+    },
+    "tech_stack": ["Python"],
+    "complexity_level": 3,
+    "estimated_days": 14,
+    "resume_bullet": "Built X using Y, achieving Z",
+    "key_features": ["Feature 1"],
+    "differentiator": "Better than average",
+}
+_RAW_PROJECT_STRING_ARCH = {**_RAW_PROJECT, "architecture": "Simple monolith"}
 
-    def test_capstone_generate_requires_auth(self, client):
-        response = client.post(
-            "/api/v1/capstone/generate",
-            json={"analysis_id": "some-id"},
-        )
-        assert response.status_code in (401, 403)
 
-    def test_capstone_get_requires_auth(self, client):
-        response = client.get("/api/v1/capstone/some-id")
-        assert response.status_code in (401, 403)
+class TestCapstoneAPI:
+    """Test capstone API endpoints."""
 
-    def test_capstone_select_requires_auth(self, client):
-        response = client.put("/api/v1/capstone/some-id/select?selected=true")
+    @pytest.mark.parametrize("method,path,body", [
+        ("POST", "/api/v1/capstone/generate", {"analysis_id": "some-id"}),
+        ("GET", "/api/v1/capstone/some-id", None),
+        ("PUT", "/api/v1/capstone/some-id/select?selected=true", None),
+    ])
+    def test_requires_auth(self, client, method, path, body):
+        response = client.request(method, path, json=body)
         assert response.status_code in (401, 403)
 
     def test_capstone_safe_parse(self):
         """Test the _safe_parse_project helper."""
         from app.api.v1.capstone import _safe_parse_project
 
-        raw = {
-            "title": "Test Project",
-            "problem_statement": "Test problem",
-            "recruiter_match_reasoning": "Test reasoning",
-            "architecture": {
-                "description": "Test arch",
-                "components": ["A", "B"],
-                "data_flow": "A → B",
-            },
-            "tech_stack": ["Python"],
-            "complexity_level": 3,
-            "estimated_days": 14,
-            "resume_bullet": "Built X using Y, achieving Z",
-            "key_features": ["Feature 1"],
-            "differentiator": "Better than average",
-        }
-        parsed = _safe_parse_project(raw)
+        parsed = _safe_parse_project(_RAW_PROJECT)
         assert parsed.title == "Test Project"
         assert parsed.complexity_level == 3
 
@@ -263,17 +300,5 @@ class TestCapstoneAPI:
         """Handle architecture as plain string."""
         from app.api.v1.capstone import _safe_parse_project
 
-        raw = {
-            "title": "Test",
-            "problem_statement": "Test",
-            "recruiter_match_reasoning": "Test",
-            "architecture": "Simple monolith",
-            "tech_stack": [],
-            "complexity_level": 2,
-            "estimated_days": 7,
-            "resume_bullet": "Test",
-            "key_features": [],
-            "differentiator": "Test",
-        }
-        parsed = _safe_parse_project(raw)
+        parsed = _safe_parse_project(_RAW_PROJECT_STRING_ARCH)
         assert parsed.architecture.description == "Simple monolith"
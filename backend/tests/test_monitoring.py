@@ -8,10 +8,26 @@ Tests for:
 - New API endpoints (/health/deep, /metrics)
 """
 
+import asyncio
+import functools
+import importlib.util
+import os
+import pathlib
 import time
+import uuid
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
-from fastapi.testclient import TestClient
+from hdrh.histogram import HdrHistogram
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.monitoring import (
+    ApplicationMetrics,
+    get_metrics,
+    check_database_health,
+    check_llm_health,
+    deep_health_check,
+)
 
 # Monitoring Module Tests
 
@@ -19,7 +35,6 @@ class TestApplicationMetrics:
     """Tests for the in-memory metrics collector."""
 
     def test_initial_state(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         snap = m.snapshot()
         assert snap["total_requests"] == 0
@@ -31,7 +46,6 @@ class TestApplicationMetrics:
         assert snap["uptime_seconds"] >= 0.0
 
     def test_record_request(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         m.record_request(200, "/api/v1/jd/analyze", 150.5)
         m.record_request(200, "/api/v1/jd/analyze", 200.3)
@@ -42,8 +56,13 @@ class TestApplicationMetrics:
         assert snap["status_codes"] == {200: 2, 404: 1}
         assert "/api/v1/jd/analyze" in snap["endpoint_latencies"]
 
+    def test_out_of_range_status_code_still_counted(self):
+        m = ApplicationMetrics()
+        m.record_request(200, "/api/v1/test", 1.0)
+        m.record_request(999, "/api/v1/test", 1.0)
+        assert m.snapshot()["status_codes"] == {200: 1, 999: 1}
+
     def test_record_server_error_increments_error_count(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         m.record_request(500, "/api/v1/repo/analyze", 1000.0)
         m.record_request(503, "/health/deep", 50.0)
@@ -53,7 +72,6 @@ class TestApplicationMetrics:
         assert snap["error_rate"] == pytest.approx(2 / 3, abs=0.01)
 
     def test_record_pipeline_run(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         m.record_pipeline_run("jd", True)
         m.record_pipeline_run("jd", True)
@@ -66,7 +84,6 @@ class TestApplicationMetrics:
         assert snap["pipelines"]["repo"]["errors"] == 0
 
     def test_latency_percentiles(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         # Add 100 requests with known latencies
         for i in range(1, 101):
@@ -80,17 +97,101 @@ class TestApplicationMetrics:
         assert stats["avg_ms"] == pytest.approx(50.5, abs=0.1)
 
     def test_latency_memory_bounding(self):
-        """Ensure latencies don't grow unbounded."""
-        from app.monitoring import ApplicationMetrics
+        """Ensure latency storage doesn't grow with request volume."""
+        m = ApplicationMetrics()
+        m.record_request(200, "/api/v1/test", 0.0)
+        hist = m._endpoint_latencies["/api/v1/test"].hist
+        footprint = hist.counts_len
+        m.record_many(200, "/api/v1/test", range(1, 1500))
+        snap = m.snapshot()
+        # Every sample is counted, but the histogram's bucket array is fixed-size
+        assert snap["endpoint_latencies"]["/api/v1/test"]["count"] == 1500
+        assert hist.counts_len == footprint
+
+    def test_endpoint_cap(self):
         m = ApplicationMetrics()
-        for i in range(1500):
+        m._max_tracked_endpoints = 3
+        for i in range(5):
+            m.record_request(200, f"/api/v1/e{i}", 1.0)
+        m.record_request(200, "/api/v1/e0", 2.0)
+        snap = m.snapshot()
+        assert snap["total_requests"] == 6
+        assert set(snap["endpoint_latencies"]) == {"/api/v1/e0", "/api/v1/e1", "/api/v1/e2"}
+        assert snap["endpoint_latencies"]["/api/v1/e0"]["count"] == 2
+
+    def test_snapshot_cost_bounded_at_endpoint_cap(self):
+        # /metrics builds the snapshot on the event loop: one percentile
+        # pass per endpoint, and never hdrh's full-bucket mean walk.
+        m = ApplicationMetrics()
+        for i in range(m._max_tracked_endpoints):
+            m.record_many(200, f"/api/v1/e{i}", (1.0, 5.0, 20.0, 250.0))
+        with (
+            patch.object(HdrHistogram, "get_mean_value", autospec=True) as mean,
+            patch.object(
+                HdrHistogram,
+                "get_percentile_to_value_dict",
+                autospec=True,
+                side_effect=HdrHistogram.get_percentile_to_value_dict,
+            ) as percentiles,
+        ):
+            snap = m.snapshot()
+        mean.assert_not_called()
+        assert percentiles.call_count == m._max_tracked_endpoints
+        assert len(snap["endpoint_latencies"]) == m._max_tracked_endpoints
+        assert snap["endpoint_latencies"]["/api/v1/e0"]["avg_ms"] == pytest.approx(69.0)
+
+    def test_record_many_matches_record_request(self):
+        single, bulk = ApplicationMetrics(), ApplicationMetrics()
+        latencies = [5.0, 5.0, 12.5, 80.0, 503.0]
+        for latency in latencies:
+            single.record_request(503, "/api/v1/test", latency)
+        bulk.record_many(503, "/api/v1/test", latencies)
+        a, b = single.snapshot(), bulk.snapshot()
+        for key in ("total_requests", "total_errors", "status_codes", "endpoint_latencies"):
+            assert b[key] == a[key]
+
+    def test_latency_sampling_keeps_counters_exact(self):
+        m = ApplicationMetrics(sample_rate=10)
+        for i in range(100):
             m.record_request(200, "/api/v1/test", float(i))
         snap = m.snapshot()
-        # Should be bounded to ~500 after cleanup
-        assert snap["endpoint_latencies"]["/api/v1/test"]["count"] <= 1000
+        assert snap["total_requests"] == 100
+        assert snap["status_codes"] == {200: 100}
+        assert snap["endpoint_latencies"]["/api/v1/test"]["count"] == 10
+
+    def test_snapshot_cached_within_ttl(self):
+        m = ApplicationMetrics(cache_ttl_seconds=60.0)
+        m.record_request(200, "/api/v1/test", 10.0)
+        first = m.snapshot()
+        m.record_request(200, "/api/v1/test", 20.0)
+        assert m.snapshot() is first
+        assert first["total_requests"] == 1
+
+    def test_snapshot_is_read_only(self):
+        m = ApplicationMetrics()
+        m.record_request(200, "/api/v1/test", 1.0)
+        snap = m.snapshot()
+        with pytest.raises(TypeError):
+            snap["total_requests"] = 0
+        with pytest.raises(TypeError):
+            snap["status_codes"][200] = 0
+
+    def test_reset_clears_counters_and_cache(self):
+        m = ApplicationMetrics(cache_ttl_seconds=60.0)
+        m.record_request(200, "/api/v1/test", 10.0)
+        m.record_pipeline_run("jd", True)
+        assert m.snapshot()["total_requests"] == 1
+        m.reset()
+        snap = m.snapshot()
+        assert snap["total_requests"] == 0
+        assert snap["endpoint_latencies"] == {}
+        assert snap["pipelines"] == {}
+        m.record_request(404, "/api/v1/test", 5.0)
+        m.reset()
+        m.record_request(200, "/api/v1/test", 5.0)
+        assert m.snapshot()["status_codes"] == {200: 1}
 
     def test_uptime_increases(self):
-        from app.monitoring import ApplicationMetrics
         m = ApplicationMetrics()
         t1 = m.uptime_seconds
         time.sleep(0.05)
@@ -101,7 +202,6 @@ class TestGetMetricsSingleton:
     """Tests for the metrics singleton accessor."""
 
     def test_get_metrics_returns_same_instance(self):
-        from app.monitoring import get_metrics
         m1 = get_metrics()
         m2 = get_metrics()
         assert m1 is m2
@@ -113,7 +213,6 @@ class TestDatabaseHealthCheck:
 
     @pytest.mark.asyncio
     async def test_healthy_database(self):
-        from app.monitoring import check_database_health
         mock_result = MagicMock()
         mock_result.data = [{"id": "test"}]
 
@@ -134,7 +233,6 @@ class TestDatabaseHealthCheck:
 
     @pytest.mark.asyncio
     async def test_database_not_initialized(self):
-        from app.monitoring import check_database_health
         with patch("app.database.get_supabase", side_effect=RuntimeError("Not initialized")):
             result = await check_database_health()
         assert result["status"] == "unavailable"
@@ -142,7 +240,6 @@ class TestDatabaseHealthCheck:
 
     @pytest.mark.asyncio
     async def test_database_connection_failure(self):
-        from app.monitoring import check_database_health
         with patch("app.database.get_supabase", side_effect=Exception("Connection refused")):
             result = await check_database_health()
         assert result["status"] == "unhealthy"
@@ -153,7 +250,6 @@ class TestLLMHealthCheck:
 
     @pytest.mark.asyncio
     async def test_groq_configured(self):
-        from app.monitoring import check_llm_health
         with patch("app.monitoring.get_settings") as mock_settings:
             mock_settings.return_value.GROQ_API_KEY = "gsk_test"
             mock_settings.return_value.OPENAI_API_KEY = None
@@ -164,7 +260,6 @@ class TestLLMHealthCheck:
 
     @pytest.mark.asyncio
     async def test_no_llm_configured(self):
-        from app.monitoring import check_llm_health
         with patch("app.monitoring.get_settings") as mock_settings:
             mock_settings.return_value.GROQ_API_KEY = ""
             mock_settings.return_value.OPENAI_API_KEY = None
@@ -173,7 +268,6 @@ class TestLLMHealthCheck:
 
     @pytest.mark.asyncio
     async def test_both_providers_configured(self):
-        from app.monitoring import check_llm_health
         with patch("app.monitoring.get_settings") as mock_settings:
             mock_settings.return_value.GROQ_API_KEY = "gsk_test"
             mock_settings.return_value.OPENAI_API_KEY = "sk-test"
@@ -186,7 +280,6 @@ class TestDeepHealthCheck:
 
     @pytest.mark.asyncio
     async def test_deep_health_all_healthy(self):
-        from app.monitoring import deep_health_check
         with (
             patch("app.monitoring.check_database_health", new_callable=AsyncMock) as mock_db,
             patch("app.monitoring.check_llm_health", new_callable=AsyncMock) as mock_llm,
@@ -206,7 +299,6 @@ class TestDeepHealthCheck:
 
     @pytest.mark.asyncio
     async def test_deep_health_db_unavailable_still_healthy_in_dev(self):
-        from app.monitoring import deep_health_check
         with (
             patch("app.monitoring.check_database_health", new_callable=AsyncMock) as mock_db,
             patch("app.monitoring.check_llm_health", new_callable=AsyncMock) as mock_llm,
@@ -222,14 +314,32 @@ class TestDeepHealthCheck:
         # DB unavailable is OK in dev
         assert result["status"] == "healthy"
 
+    @pytest.mark.asyncio
+    async def test_deep_health_runs_checks_concurrently(self):
+        # Each check waits until both have started — run sequentially, the
+        # first would never pass the barrier and wait_for would time out.
+        barrier = asyncio.Barrier(2)
+
+        async def gated_check():
+            await barrier.wait()
+            return {"status": "healthy"}
+
+        # new= replaces the check outright; a side_effect lambda would hand
+        # back an unawaited coroutine instead of the result dict.
+        with (
+            patch("app.monitoring.check_database_health", new=gated_check),
+            patch("app.monitoring.check_llm_health", new=gated_check),
+        ):
+            result = await asyncio.wait_for(deep_health_check(), timeout=5)
+
+        assert result["status"] == "healthy"
+
 # API Endpoint Tests
 
 class TestHealthEndpoint:
     """Tests for /health endpoint."""
 
-    def test_health_check(self):
-        from app.main import app
-        client = TestClient(app)
+    def test_health_check(self, client):
         response = client.get("/health")
         assert response.status_code == 200
         data = response.json()
@@ -240,9 +350,7 @@ class TestHealthEndpoint:
 class TestDeepHealthEndpoint:
     """Tests for /health/deep endpoint."""
 
-    def test_deep_health_endpoint(self):
-        from app.main import app
-        client = TestClient(app)
+    def test_deep_health_endpoint(self, client):
         with (
             patch("app.monitoring.check_database_health", new_callable=AsyncMock) as mock_db,
             patch("app.monitoring.check_llm_health", new_callable=AsyncMock) as mock_llm,
@@ -260,9 +368,7 @@ class TestDeepHealthEndpoint:
 class TestMetricsEndpoint:
     """Tests for /metrics endpoint."""
 
-    def test_metrics_returns_snapshot(self):
-        from app.main import app
-        client = TestClient(app)
+    def test_metrics_returns_snapshot(self, client):
         response = client.get("/metrics")
         assert response.status_code == 200
         data = response.json()
@@ -276,25 +382,25 @@ class TestMetricsEndpoint:
 class TestRequestTracing:
     """Tests for X-Request-ID tracing middleware."""
 
-    def test_response_includes_request_id(self):
-        from app.main import app
-        client = TestClient(app)
+    def test_response_includes_request_id(self, client):
         response = client.get("/health")
         assert "x-request-id" in response.headers
-        # Should be a UUID4
         request_id = response.headers["x-request-id"]
-        assert len(request_id) == 36  # UUID format
+        assert uuid.UUID(request_id).version == 4
+        assert str(uuid.UUID(request_id)) == request_id  # canonical form
 
-    def test_respects_incoming_request_id(self):
-        from app.main import app
-        client = TestClient(app)
+    def test_respects_incoming_request_id(self, client):
         custom_id = "custom-trace-12345"
         response = client.get("/health", headers={"x-request-id": custom_id})
         assert response.headers["x-request-id"] == custom_id
 
-    def test_generates_unique_ids(self):
-        from app.main import app
-        client = TestClient(app)
+    @pytest.mark.parametrize("bad_id", ["x" * 129, "trace id with spaces", "<script>"])
+    def test_replaces_malformed_request_id(self, client, bad_id):
+        response = client.get("/health", headers={"x-request-id": bad_id})
+        assert response.headers["x-request-id"] != bad_id
+        assert uuid.UUID(response.headers["x-request-id"]).version == 4
+
+    def test_generates_unique_ids(self, client):
         ids = set()
         for _ in range(10):
             response = client.get("/health")
@@ -303,12 +409,15 @@ class TestRequestTracing:
 
 # Production Config Validation Tests
 
+@functools.lru_cache(maxsize=None)
+def _settings(**kw) -> Settings:
+    """Memoized Settings construction for configs that validate cleanly."""
+    return Settings(**kw)
+
 class TestProductionConfigValidation:
     """Tests for production environment config checks."""
 
     def test_production_requires_secret_key(self):
-        from pydantic import ValidationError
-        from app.config import Settings
         with pytest.raises(ValidationError, match="SECRET_KEY"):
             Settings(
                 ENVIRONMENT="production",
@@ -316,26 +425,21 @@ class TestProductionConfigValidation:
             )
 
     def test_production_accepts_valid_secret_key(self):
-        from app.config import Settings
-        s = Settings(
+        s = _settings(
             ENVIRONMENT="production",
             SECRET_KEY="a" * 64,
         )
         assert s.SECRET_KEY == "a" * 64
 
     def test_development_allows_auto_generated_key(self):
-        from app.config import Settings
-        s = Settings(ENVIRONMENT="development")
+        s = _settings(ENVIRONMENT="development")
         assert len(s.SECRET_KEY) >= 32
 
     def test_testing_allows_any_key(self):
-        from app.config import Settings
-        s = Settings(ENVIRONMENT="testing", SECRET_KEY="test-key")
+        s = _settings(ENVIRONMENT="testing", SECRET_KEY="test-key")
         assert s.SECRET_KEY == "test-key"
 
     def test_supabase_url_requires_https(self):
-        from pydantic import ValidationError
-        from app.config import Settings
         with pytest.raises(ValidationError, match="HTTPS"):
             Settings(SUPABASE_URL="http://insecure.example.com")
 
@@ -345,8 +449,6 @@ class TestGunicornConfig:
     """Validate gunicorn config loads without errors."""
 
     def test_gunicorn_config_importable(self):
-        import importlib.util
-        import os
         config_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)),
             "gunicorn.conf.py",
@@ -363,62 +465,45 @@ class TestGunicornConfig:
 
 # Migration Files Existence
 
+MIGRATIONS_DIR = pathlib.Path(__file__).resolve().parent.parent / "migrations"
+
+@functools.cache
+def _read(name: str) -> str:
+    return (MIGRATIONS_DIR / name).read_text()
+
 class TestMigrationFiles:
     """Verify all migration SQL files exist."""
 
     def test_all_migration_files_exist(self):
-        import os
-        migrations_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "migrations",
-        )
         expected_files = [
             "001_initial_schema.sql",
             "002_scaffolds.sql",
             "003_portfolio_outputs.sql",
         ]
         for filename in expected_files:
-            path = os.path.join(migrations_dir, filename)
-            assert os.path.exists(path), f"Missing migration: {filename}"
+            assert (MIGRATIONS_DIR / filename).exists(), f"Missing migration: {filename}"
 
     def test_migration_files_contain_rls(self):
         """Every table must have RLS enabled."""
-        import os
-        migrations_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "migrations",
-        )
-        for filename in os.listdir(migrations_dir):
-            if not filename.endswith(".sql"):
+        for path in MIGRATIONS_DIR.iterdir():
+            if path.suffix != ".sql":
                 continue
-            with open(os.path.join(migrations_dir, filename)) as f:
-                content = f.read()
-            if "CREATE TABLE" in content:
-                assert "ENABLE ROW LEVEL SECURITY" in content, (
-                    f"Migration {filename} creates tables without RLS"
+            # Markers are ASCII, so search the raw bytes without decoding
+            content = path.read_bytes()
+            if b"CREATE TABLE" in content:
+                assert b"ENABLE ROW LEVEL SECURITY" in content, (
+                    f"Migration {path.name} creates tables without RLS"
                 )
 
     def test_migration_002_creates_scaffolds(self):
-        import os
-        path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "migrations", "002_scaffolds.sql",
-        )
-        with open(path) as f:
-            content = f.read()
+        content = _read("002_scaffolds.sql")
         assert "scaffolds" in content
         assert "user_id" in content
         assert "project_title" in content
         assert "files JSONB" in content
 
     def test_migration_003_creates_portfolio_outputs(self):
-        import os
-        path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "migrations", "003_portfolio_outputs.sql",
-        )
-        with open(path) as f:
-            content = f.read()
+        content = _read("003_portfolio_outputs.sql")
         assert "portfolio_outputs" in content
         assert "readme_markdown" in content
         assert "resume_bullets JSONB" in content
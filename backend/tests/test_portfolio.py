@@ -1,24 +1,16 @@
 """
 Tests for Phase 4 — Portfolio Optimizer
 
-Covers: schemas, prompts, node logic, validation, pipeline, API endpoints.
+Covers: node logic, validation, pipeline, API endpoints.
+Schema and prompt tests live in test_portfolio_pure.py.
 """
 
 import json
+import math
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
-
-from app.schemas.portfolio import (
-    PortfolioOptimizeRequest,
-    PortfolioOptimizeResponse,
-    ResumeBullet,
-    DemoScript,
-    LinkedInPost,
-)
-from app.prompts.portfolio_opt import (
-    PORTFOLIO_SYSTEM_PROMPT,
-    build_portfolio_user_prompt,
-)
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
 from app.agents.nodes.portfolio_node import (
     portfolio_optimizer_node,
     _parse_portfolio_response,
@@ -28,6 +20,9 @@ from app.agents.nodes.portfolio_node import (
     MAX_DEMO_STEPS,
 )
 
+_AUTH_FAIL = frozenset({401, 403})
+_AUTH_OR_VALIDATION = frozenset({401, 422})
+
 # ─── Fixtures ───
 
 VALID_PORTFOLIO_OUTPUT = {
@@ -74,149 +69,11 @@ VALID_PORTFOLIO_OUTPUT = {
     },
 }
 
-# Schema Tests
-
-class TestPortfolioSchemas:
-    """Test Pydantic schema validation."""
-
-    def test_valid_request(self):
-        req = PortfolioOptimizeRequest(
-            project_title="My Project",
-            project_description="A full-stack web application with AI features",
-            tech_stack=["Python", "React", "PostgreSQL"],
-            target_role="Full-Stack Engineer",
-        )
-        assert req.project_title == "My Project"
-        assert len(req.tech_stack) == 3
-        assert req.target_role == "Full-Stack Engineer"
-
-    def test_request_min_title_length(self):
-        with pytest.raises(Exception):
-            PortfolioOptimizeRequest(
-                project_title="AB",  # Too short (min 3)
-                project_description="A project description that is long enough",
-            )
-
-    def test_request_min_description_length(self):
-        with pytest.raises(Exception):
-            PortfolioOptimizeRequest(
-                project_title="My Project",
-                project_description="Too short",  # min 20
-            )
-
-    def test_request_repo_score_bounds(self):
-        # Valid
-        req = PortfolioOptimizeRequest(
-            project_title="My Project",
-            project_description="A full-stack web application with AI features",
-            repo_score=8.5,
-        )
-        assert req.repo_score == 8.5
-
-        # Invalid: over 10
-        with pytest.raises(Exception):
-            PortfolioOptimizeRequest(
-                project_title="My Project",
-                project_description="A full-stack web application with AI features",
-                repo_score=11.0,
-            )
-
-    def test_resume_bullet_schema(self):
-        bullet = ResumeBullet(
-            bullet="Built a scalable API layer",
-            keywords=["API", "scalable"],
-            impact_type="technical",
-        )
-        assert len(bullet.keywords) == 2
-
-    def test_demo_script_schema(self):
-        script = DemoScript(
-            total_duration_seconds=120,
-            opening_hook="Watch this",
-            closing_cta="Star the repo",
-            steps=[],
-        )
-        assert script.total_duration_seconds == 120
-
-    def test_linkedin_post_schema(self):
-        post = LinkedInPost(
-            hook="I built something cool",
-            body="Here's what I made.",
-            hashtags=["#dev"],
-            call_to_action="Check it out",
-        )
-        assert post.hook == "I built something cool"
-
-    def test_response_schema(self):
-        resp = PortfolioOptimizeResponse(
-            readme_markdown="# README",
-            resume_bullets=[
-                {
-                    "bullet": "test",
-                    "keywords": [],
-                    "impact_type": "technical",
-                }
-            ],
-            demo_script={
-                "total_duration_seconds": 90,
-                "opening_hook": "test",
-                "closing_cta": "test",
-                "steps": [],
-            },
-            linkedin_post={
-                "hook": "test",
-                "body": "test",
-                "hashtags": [],
-                "call_to_action": "test",
-            },
-        )
-        assert resp.readme_markdown == "# README"
-
-# Prompt Tests
-
-class TestPortfolioPrompts:
-    """Test prompt construction."""
+_VALID_JSON = json.dumps(VALID_PORTFOLIO_OUTPUT)
 
-    def test_system_prompt_contains_instructions(self):
-        assert "README" in PORTFOLIO_SYSTEM_PROMPT
-        assert "resume_bullets" in PORTFOLIO_SYSTEM_PROMPT
-        assert "demo_script" in PORTFOLIO_SYSTEM_PROMPT
-        assert "linkedin_post" in PORTFOLIO_SYSTEM_PROMPT
-        assert "valid JSON" in PORTFOLIO_SYSTEM_PROMPT
-
-    def test_user_prompt_basic(self):
-        prompt = build_portfolio_user_prompt(
-            project_title="Shortlist",
-            project_description="AI portfolio builder",
-            tech_stack=["Python", "React"],
-        )
-        assert "Shortlist" in prompt
-        assert "AI portfolio builder" in prompt
-        assert "Python" in prompt
-
-    def test_user_prompt_with_all_params(self):
-        prompt = build_portfolio_user_prompt(
-            project_title="Shortlist",
-            project_description="AI portfolio builder",
-            tech_stack=["Python", "React"],
-            key_features=["AI analysis", "Scaffolding"],
-            repo_score=8.5,
-            target_role="Full-Stack Engineer",
-            architecture="Microservices with LangGraph",
-        )
-        assert "8.5" in prompt
-        assert "Full-Stack Engineer" in prompt
-        assert "Microservices with LangGraph" in prompt
-        assert "AI analysis" in prompt
-
-    def test_user_prompt_without_optional_params(self):
-        prompt = build_portfolio_user_prompt(
-            project_title="Test",
-            project_description="Test desc",
-            tech_stack=[],
-        )
-        assert "Target Role" not in prompt
-        assert "Repo Score" not in prompt
+# A list, not a tuple: _validate_portfolio only truncates list steps (it
+# slices rather than mutates, so sharing it across tests is safe).
+_BIG_STEPS = [{"timestamp": f"{i}:00", "action": "step", "narration": "n"} for i in range(20)]
 
 # Node Logic Tests
 
@@ -224,147 +81,133 @@ class TestPortfolioNode:
     """Test the portfolio optimizer node internals."""
 
     def test_parse_valid_json(self):
-        raw = json.dumps(VALID_PORTFOLIO_OUTPUT)
+        raw = _VALID_JSON
         parsed = _parse_portfolio_response(raw)
         assert "readme_markdown" in parsed
         assert len(parsed["resume_bullets"]) == 3
 
     def test_parse_markdown_wrapped_json(self):
-        raw = f"```json\n{json.dumps(VALID_PORTFOLIO_OUTPUT)}\n```"
+        raw = f"```json\n{_VALID_JSON}\n```"
         parsed = _parse_portfolio_response(raw)
         assert "readme_markdown" in parsed
 
     def test_parse_json_with_surrounding_text(self):
-        raw = f"Here is the output:\n{json.dumps(VALID_PORTFOLIO_OUTPUT)}\nDone!"
+        raw = f"Here is the output:\n{_VALID_JSON}\nDone!"
         parsed = _parse_portfolio_response(raw)
         assert "readme_markdown" in parsed
 
+    def test_parse_non_finite_numbers(self):
+        # orjson rejects NaN/1e400; the json fallback still parses them
+        parsed = _parse_portfolio_response('{"readme_markdown": "# R", "score": NaN, "stars": 1e400}')
+        assert parsed["readme_markdown"] == "# R"
+        assert math.isnan(parsed["score"])
+        assert math.isinf(parsed["stars"])
+
     def test_parse_invalid_json_raises(self):
         with pytest.raises(ValueError):
             _parse_portfolio_response("This is not JSON at all")
 
     def test_validate_valid_output(self):
-        result = _validate_portfolio(VALID_PORTFOLIO_OUTPUT.copy())
+        result = _validate_portfolio({**VALID_PORTFOLIO_OUTPUT})
         assert result["readme_markdown"] == VALID_PORTFOLIO_OUTPUT["readme_markdown"]
         assert len(result["resume_bullets"]) == 3
 
     def test_validate_truncates_long_readme(self):
-        data = VALID_PORTFOLIO_OUTPUT.copy()
-        data["readme_markdown"] = "x" * (MAX_README_LENGTH + 1000)
-        result = _validate_portfolio(data)
+        result = _validate_portfolio({
+            **VALID_PORTFOLIO_OUTPUT,
+            "readme_markdown": "x" * (MAX_README_LENGTH + 1000),
+        })
         assert len(result["readme_markdown"]) == MAX_README_LENGTH
 
     def test_validate_truncates_long_bullets(self):
-        data = VALID_PORTFOLIO_OUTPUT.copy()
-        data["resume_bullets"] = [
-            {
-                "bullet": "A" * (MAX_BULLET_LENGTH + 50),
-                "keywords": ["test"],
-                "impact_type": "technical",
-            }
-        ]
-        result = _validate_portfolio(data)
+        result = _validate_portfolio({
+            **VALID_PORTFOLIO_OUTPUT,
+            "resume_bullets": [
+                {
+                    "bullet": "A" * (MAX_BULLET_LENGTH + 50),
+                    "keywords": ["test"],
+                    "impact_type": "technical",
+                }
+            ],
+        })
         assert len(result["resume_bullets"][0]["bullet"]) == MAX_BULLET_LENGTH
 
     def test_validate_truncates_excess_demo_steps(self):
-        data = VALID_PORTFOLIO_OUTPUT.copy()
-        data["demo_script"] = {
-            "total_duration_seconds": 120,
-            "opening_hook": "test",
-            "closing_cta": "test",
-            "steps": [{"timestamp": f"{i}:00", "action": "step", "narration": "n"} for i in range(20)],
-        }
-        result = _validate_portfolio(data)
+        result = _validate_portfolio({
+            **VALID_PORTFOLIO_OUTPUT,
+            "demo_script": {
+                "total_duration_seconds": 120,
+                "opening_hook": "test",
+                "closing_cta": "test",
+                "steps": _BIG_STEPS,
+            },
+        })
         assert len(result["demo_script"]["steps"]) == MAX_DEMO_STEPS
 
 # Node Async Tests
 
-class TestPortfolioNodeAsync:
-    """Test the async portfolio_optimizer_node function."""
+_NODE_STATE = {
+    "portfolio_project_title": "Shortlist",
+    "portfolio_project_description": "AI portfolio builder",
+    "portfolio_tech_stack": ["Python", "React"],
+    "portfolio_key_features": ["AI analysis"],
+    "portfolio_repo_score": 8.0,
+    "portfolio_target_role": "Full-Stack Engineer",
+    "messages": [],
+}
 
-    @pytest.mark.asyncio
-    async def test_node_missing_title(self):
-        state = {
-            "portfolio_project_title": "",
-            "portfolio_project_description": "A description",
-            "portfolio_tech_stack": [],
-            "messages": [],
-        }
-        result = await portfolio_optimizer_node(state)
-        assert result["current_phase"] == "portfolio_error"
-        assert len(result["errors"]) > 0
+_RESPONSE_OK = SimpleNamespace(content=_VALID_JSON)
+_RESPONSE_BAD_JSON = SimpleNamespace(content="Not valid JSON")
 
-    @pytest.mark.asyncio
-    async def test_node_missing_description(self):
-        state = {
-            "portfolio_project_title": "My Project",
-            "portfolio_project_description": "",
-            "portfolio_tech_stack": [],
-            "messages": [],
-        }
-        result = await portfolio_optimizer_node(state)
-        assert result["current_phase"] == "portfolio_error"
+@pytest.fixture(scope="module")
+def _shared_llm():
+    return AsyncMock()
 
-    @pytest.mark.asyncio
-    async def test_node_success(self):
-        mock_response = MagicMock()
-        mock_response.content = json.dumps(VALID_PORTFOLIO_OUTPUT)
-
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke.return_value = mock_response
-
-        with patch("app.agents.nodes.portfolio_node.get_llm", return_value=mock_llm):
-            state = {
-                "portfolio_project_title": "Shortlist",
-                "portfolio_project_description": "AI portfolio builder",
-                "portfolio_tech_stack": ["Python", "React"],
-                "portfolio_key_features": ["AI analysis"],
-                "portfolio_repo_score": 8.0,
-                "portfolio_target_role": "Full-Stack Engineer",
-                "messages": [],
-            }
-            result = await portfolio_optimizer_node(state)
-
-        assert result["current_phase"] == "portfolio_complete"
-        assert "portfolio_output" in result
-        assert result["portfolio_output"]["readme_markdown"] == VALID_PORTFOLIO_OUTPUT["readme_markdown"]
-        assert len(result["portfolio_output"]["resume_bullets"]) == 3
+@pytest.fixture
+def mock_llm(_shared_llm):
+    """One AsyncMock for the module, reset after each test."""
+    yield _shared_llm
+    _shared_llm.reset_mock(return_value=True, side_effect=True)
 
-    @pytest.mark.asyncio
-    async def test_node_llm_failure(self):
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke.side_effect = Exception("LLM timeout")
-
-        with patch("app.agents.nodes.portfolio_node.get_llm", return_value=mock_llm):
-            state = {
-                "portfolio_project_title": "Test",
-                "portfolio_project_description": "Test project description",
-                "portfolio_tech_stack": [],
-                "messages": [],
-            }
-            result = await portfolio_optimizer_node(state)
+class TestPortfolioNodeAsync:
+    """Test the async portfolio_optimizer_node function."""
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "missing",
+        ["portfolio_project_title", "portfolio_project_description"],
+        ids=["missing_title", "missing_description"],
+    )
+    async def test_node_missing_input(self, missing):
+        result = await portfolio_optimizer_node({**_NODE_STATE, missing: ""})
         assert result["current_phase"] == "portfolio_error"
-        assert any("LLM" in e for e in result["errors"])
+        assert len(result["errors"]) > 0
 
     @pytest.mark.asyncio
-    async def test_node_invalid_json_response(self):
-        mock_response = MagicMock()
-        mock_response.content = "Not valid JSON"
-
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke.return_value = mock_response
-
-        with patch("app.agents.nodes.portfolio_node.get_llm", return_value=mock_llm):
-            state = {
-                "portfolio_project_title": "Test",
-                "portfolio_project_description": "Test description",
-                "portfolio_tech_stack": [],
-                "messages": [],
-            }
-            result = await portfolio_optimizer_node(state)
+    @pytest.mark.parametrize(
+        "ainvoke,expected_phase,error_fragment",
+        [
+            ({"return_value": _RESPONSE_OK}, "portfolio_complete", None),
+            ({"side_effect": Exception("LLM timeout")}, "portfolio_error", "LLM"),
+            ({"return_value": _RESPONSE_BAD_JSON}, "portfolio_error", "parse"),
+        ],
+        ids=["success", "llm_failure", "invalid_json_response"],
+    )
+    async def test_node_with_llm(self, monkeypatch, mock_llm, ainvoke, expected_phase, error_fragment):
+        mock_llm.ainvoke.configure_mock(**ainvoke)
+        monkeypatch.setattr(
+            "app.agents.nodes.portfolio_node.get_llm",
+            lambda *args, **kwargs: mock_llm,
+        )
+        result = await portfolio_optimizer_node(_NODE_STATE)
 
-        assert result["current_phase"] == "portfolio_error"
+        assert result["current_phase"] == expected_phase
+        if error_fragment is None:
+            output = result["portfolio_output"]
+            assert output["readme_markdown"] == VALID_PORTFOLIO_OUTPUT["readme_markdown"]
+            assert len(output["resume_bullets"]) == 3
+        else:
+            assert any(error_fragment in e for e in result["errors"])
 
 # Pipeline Tests
 
@@ -388,59 +231,40 @@ class TestPortfolioPipeline:
 
 # API Tests
 
+@pytest.mark.xdist_group("portfolio_api")
 class TestPortfolioAPI:
     """Test portfolio API endpoints."""
 
     @pytest.mark.asyncio
-    async def test_optimize_requires_auth(self):
-        from httpx import AsyncClient, ASGITransport
-        from app.main import app
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.post(
-                "/api/v1/portfolio/optimize",
-                json={
-                    "project_title": "Test Project",
-                    "project_description": "A long enough project description here",
-                    "tech_stack": ["Python"],
-                },
-            )
-            assert resp.status_code in (401, 403)
+    async def test_optimize_requires_auth(self, async_client):
+        resp = await async_client.post(
+            "/api/v1/portfolio/optimize",
+            json={
+                "project_title": "Test Project",
+                "project_description": "A long enough project description here",
+                "tech_stack": ["Python"],
+            },
+        )
+        assert resp.status_code in _AUTH_FAIL
 
     @pytest.mark.asyncio
-    async def test_get_portfolio_requires_auth(self):
-        from httpx import AsyncClient, ASGITransport
-        from app.main import app
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/v1/portfolio/some-id")
-            assert resp.status_code in (401, 403)
+    async def test_get_portfolio_requires_auth(self, async_client):
+        resp = await async_client.get("/api/v1/portfolio/some-id")
+        assert resp.status_code in _AUTH_FAIL
 
     @pytest.mark.asyncio
-    async def test_list_portfolios_requires_auth(self):
-        from httpx import AsyncClient, ASGITransport
-        from app.main import app
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.get("/api/v1/portfolio/")
-            assert resp.status_code in (401, 403)
+    async def test_list_portfolios_requires_auth(self, async_client):
+        resp = await async_client.get("/api/v1/portfolio/")
+        assert resp.status_code in _AUTH_FAIL
 
     @pytest.mark.asyncio
-    async def test_optimize_validates_short_title(self):
-        from httpx import AsyncClient, ASGITransport
-        from app.main import app
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            resp = await client.post(
-                "/api/v1/portfolio/optimize",
-                json={
-                    "project_title": "AB",  # Too short
-                    "project_description": "A long enough project description here",
-                },
-            )
-            # Auth runs before validation
-            assert resp.status_code in (401, 422)
+    async def test_optimize_validates_short_title(self, async_client):
+        resp = await async_client.post(
+            "/api/v1/portfolio/optimize",
+            json={
+                "project_title": "AB",  # Too short
+                "project_description": "A long enough project description here",
+            },
+        )
+        # Auth runs before validation
+        assert resp.status_code in _AUTH_OR_VALIDATION
@@ -0,0 +1,173 @@
+"""
+Tests for Phase 4 — Portfolio Optimizer (pure)
+
+Covers: schemas and prompt construction. Synchronous and side-effect free,
+so CI runs them first with a stripped plugin set (-m unit -p no:asyncio).
+"""
+
+import pytest
+
+from app.schemas.portfolio import (
+    PortfolioOptimizeRequest,
+    PortfolioOptimizeResponse,
+    ResumeBullet,
+    DemoScript,
+    LinkedInPost,
+)
+from app.prompts.portfolio_opt import (
+    PORTFOLIO_SYSTEM_PROMPT,
+    build_portfolio_user_prompt,
+)
+
+pytestmark = pytest.mark.unit
+
+# ─── Fixtures ───
+
+_RESPONSE_PAYLOAD = {
+    "readme_markdown": "# README",
+    "resume_bullets": [
+        {
+            "bullet": "Built a scalable API layer",
+            "keywords": ["API"],
+            "impact_type": "technical",
+        }
+    ],
+    "demo_script": {
+        "total_duration_seconds": 90,
+        "opening_hook": "Watch this",
+        "closing_cta": "Star the repo",
+        "steps": [],
+    },
+    "linkedin_post": {
+        "hook": "I built something cool",
+        "body": "Here's what I made.",
+        "hashtags": ["#dev"],
+        "call_to_action": "Check it out",
+    },
+}
+
+# Schema Tests
+
+class TestPortfolioSchemas:
+    """Test Pydantic schema validation."""
+
+    def test_valid_request(self):
+        req = PortfolioOptimizeRequest(
+            project_title="My Project",
+            project_description="A full-stack web application with AI features",
+            tech_stack=["Python", "React", "PostgreSQL"],
+            target_role="Full-Stack Engineer",
+        )
+        assert req.project_title == "My Project"
+        assert len(req.tech_stack) == 3
+        assert req.target_role == "Full-Stack Engineer"
+
+    def test_request_min_title_length(self):
+        with pytest.raises(Exception):
+            PortfolioOptimizeRequest(
+                project_title="AB",  # Too short (min 3)
+                project_description="A project description that is long enough",
+            )
+
+    def test_request_min_description_length(self):
+        with pytest.raises(Exception):
+            PortfolioOptimizeRequest(
+                project_title="My Project",
+                project_description="Too short",  # min 20
+            )
+
+    def test_request_repo_score_bounds(self):
+        # Valid
+        req = PortfolioOptimizeRequest(
+            project_title="My Project",
+            project_description="A full-stack web application with AI features",
+            repo_score=8.5,
+        )
+        assert req.repo_score == 8.5
+
+        # Invalid: over 10
+        with pytest.raises(Exception):
+            PortfolioOptimizeRequest(
+                project_title="My Project",
+                project_description="A full-stack web application with AI features",
+                repo_score=11.0,
+            )
+
+    def test_resume_bullet_schema(self):
+        bullet = ResumeBullet(
+            bullet="Built a scalable API layer",
+            keywords=["API", "scalable"],
+            impact_type="technical",
+        )
+        assert len(bullet.keywords) == 2
+
+    def test_demo_script_schema(self):
+        script = DemoScript(
+            total_duration_seconds=120,
+            opening_hook="Watch this",
+            closing_cta="Star the repo",
+            steps=[],
+        )
+        assert script.total_duration_seconds == 120
+
+    def test_linkedin_post_schema(self):
+        post = LinkedInPost(
+            hook="I built something cool",
+            body="Here's what I made.",
+            hashtags=["#dev"],
+            call_to_action="Check it out",
+        )
+        assert post.hook == "I built something cool"
+
+    def test_response_schema(self):
+        resp = PortfolioOptimizeResponse(**_RESPONSE_PAYLOAD)
+        assert resp.readme_markdown == "# README"
+        assert isinstance(resp.resume_bullets[0], ResumeBullet)
+        assert isinstance(resp.demo_script, DemoScript)
+        assert isinstance(resp.linkedin_post, LinkedInPost)
+
+# Prompt Tests
+
+class TestPortfolioPrompts:
+    """Test prompt construction."""
+
+    def test_system_prompt_contains_instructions(self):
+        assert "README" in PORTFOLIO_SYSTEM_PROMPT
+        assert "resume_bullets" in PORTFOLIO_SYSTEM_PROMPT
+        assert "demo_script" in PORTFOLIO_SYSTEM_PROMPT
+        assert "linkedin_post" in PORTFOLIO_SYSTEM_PROMPT
+        assert "valid JSON" in PORTFOLIO_SYSTEM_PROMPT
+
+    def test_user_prompt_basic(self):
+        prompt = build_portfolio_user_prompt(
+            project_title="Shortlist",
+            project_description="AI portfolio builder",
+            tech_stack=["Python", "React"],
+        )
+        assert "Shortlist" in prompt
+        assert "AI portfolio builder" in prompt
+        assert "Python" in prompt
+
+    def test_user_prompt_with_all_params(self):
+        prompt = build_portfolio_user_prompt(
+            project_title="Shortlist",
+            project_description="AI portfolio builder",
+            tech_stack=["Python", "React"],
+            key_features=["AI analysis", "Scaffolding"],
+            repo_score=8.5,
+            target_role="Full-Stack Engineer",
+            architecture="Microservices with LangGraph",
+        )
+        assert "8.5" in prompt
+        assert "Full-Stack Engineer" in prompt
+        assert "Microservices with LangGraph" in prompt
+        assert "AI analysis" in prompt
+
+    def test_user_prompt_without_optional_params(self):
+        prompt = build_portfolio_user_prompt(
+            project_title="Test",
+            project_description="Test desc",
+            tech_stack=[],
+        )
+        assert "Target Role" not in prompt
+        assert "Repo Score" not in prompt
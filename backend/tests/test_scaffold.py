@@ -4,9 +4,26 @@ Shortlist — Scaffold Generator Tests
 Tests for scaffold generation: prompts, node, pipeline, API, schemas.
 """
 
-import json
+import asyncio
+import orjson
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import MappingProxyType, SimpleNamespace
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.api.deps import get_current_user
+from app.schemas.scaffold import ScaffoldRequest, GeneratedFile, ScaffoldResponse
+from app.prompts.scaffold_gen import SCAFFOLD_SYSTEM_PROMPT, build_scaffold_user_prompt
+from app.agents.nodes.scaffold_node import (
+    scaffold_generator_node,
+    _sanitize_path,
+    _validate_scaffold,
+    _parse_scaffold_response,
+)
+from app.agents.orchestrator import compile_scaffold_pipeline, build_scaffold_pipeline
+
+# 600 KB — over MAX_SCAFFOLD_CONTENT_BYTES (512 KB) enforced by _validate_scaffold.
+_BIG_CONTENT = "x" * (600 * 1024)
 
 # Schema Tests
 
@@ -14,8 +31,6 @@ class TestScaffoldSchemas:
     """Test Pydantic schema validation for scaffold models."""
 
     def test_scaffold_request_valid(self):
-        from app.schemas.scaffold import ScaffoldRequest
-
         req = ScaffoldRequest(
             project_title="My Test Project",
             project_description="A test project with enough description text.",
@@ -29,8 +44,6 @@ class TestScaffoldSchemas:
         assert req.include_docker is True
 
     def test_scaffold_request_with_project_id(self):
-        from app.schemas.scaffold import ScaffoldRequest
-
         req = ScaffoldRequest(
             project_title="Linked Project",
             project_description="A scaffold linked to a capstone project.",
@@ -42,9 +55,6 @@ class TestScaffoldSchemas:
         assert req.analysis_id == "def-456"
 
     def test_scaffold_request_title_too_short(self):
-        from app.schemas.scaffold import ScaffoldRequest
-        from pydantic import ValidationError
-
         with pytest.raises(ValidationError):
             ScaffoldRequest(
                 project_title="AB",  # too short
@@ -52,9 +62,6 @@ class TestScaffoldSchemas:
             )
 
     def test_scaffold_request_description_too_short(self):
-        from app.schemas.scaffold import ScaffoldRequest
-        from pydantic import ValidationError
-
         with pytest.raises(ValidationError):
             ScaffoldRequest(
                 project_title="Valid Title",
@@ -62,8 +69,6 @@ class TestScaffoldSchemas:
             )
 
     def test_generated_file_model(self):
-        from app.schemas.scaffold import GeneratedFile
-
         f = GeneratedFile(
             path="src/main.py",
             content="print('hello')",
@@ -74,8 +79,6 @@ class TestScaffoldSchemas:
         assert f.language == "python"
 
     def test_scaffold_response_model(self):
-        from app.schemas.scaffold import ScaffoldResponse, GeneratedFile
-
         resp = ScaffoldResponse(
             project_name="test-project",
             files=[
@@ -97,13 +100,10 @@ class TestScaffoldPrompts:
     """Test scaffold prompt generation."""
 
     def test_system_prompt_exists(self):
-        from app.prompts.scaffold_gen import SCAFFOLD_SYSTEM_PROMPT
         assert "production-ready" in SCAFFOLD_SYSTEM_PROMPT.lower()
         assert "JSON" in SCAFFOLD_SYSTEM_PROMPT
 
     def test_build_user_prompt_basic(self):
-        from app.prompts.scaffold_gen import build_scaffold_user_prompt
-
         prompt = build_scaffold_user_prompt(
             project_title="Task Manager API",
             project_description="A RESTful task management API",
@@ -114,8 +114,6 @@ class TestScaffoldPrompts:
         assert "Include Docker: True" in prompt
 
     def test_build_user_prompt_with_options(self):
-        from app.prompts.scaffold_gen import build_scaffold_user_prompt
-
         prompt = build_scaffold_user_prompt(
             project_title="CLI Tool",
             project_description="A command-line utility for data processing",
@@ -130,8 +128,6 @@ class TestScaffoldPrompts:
         assert "Intermediate" in prompt
 
     def test_build_user_prompt_with_context(self):
-        from app.prompts.scaffold_gen import build_scaffold_user_prompt
-
         prompt = build_scaffold_user_prompt(
             project_title="ML Pipeline",
             project_description="An ML training pipeline service",
@@ -146,59 +142,86 @@ class TestScaffoldPrompts:
 
 # Scaffold Node Tests
 
+_SCAFFOLD_PAYLOAD = {
+    "project_name": "task-manager-api",
+    "files": [
+        {
+            "path": "src/main.py",
+            "content": "from fastapi import FastAPI\napp = FastAPI()\n",
+            "language": "python",
+            "description": "Application entry point",
+        },
+        {
+            "path": "README.md",
+            "content": "# Task Manager API\n\nA RESTful task management API.",
+            "language": "markdown",
+            "description": "Project readme",
+        },
+        {
+            "path": "requirements.txt",
+            "content": "fastapi>=0.100.0\nuvicorn>=0.23.0\n",
+            "language": "text",
+            "description": "Python dependencies",
+        },
+    ],
+    "file_tree": "├── src/\n│   └── main.py\n├── README.md\n└── requirements.txt",
+}
+
+_SCAFFOLD_JSON = orjson.dumps(_SCAFFOLD_PAYLOAD).decode()
+
+_RESP = SimpleNamespace(content=_SCAFFOLD_JSON)
+_RESP_BAD_JSON = SimpleNamespace(content="This is not valid JSON at all")
+
+async def _fake_ainvoke(*a, **k):
+    return _RESP
+
+async def _fake_ainvoke_bad_json(*a, **k):
+    return _RESP_BAD_JSON
+
+async def _fake_ainvoke_err(*a, **k):
+    raise RuntimeError("LLM offline")
+
+# scaffold_generator_node only reads its state, so the shallow copy in
+# _state() can safely share the nested lists/dicts.
+_BASE_STATE = MappingProxyType({
+    "scaffold_project_title": "Test",
+    "scaffold_project_description": "Test",
+    "scaffold_tech_stack": [],
+    "scaffold_options": {},
+    "messages": [],
+    "errors": [],
+})
+
+def _state(**overrides):
+    return {**_BASE_STATE, **overrides}
+
 class TestScaffoldNode:
     """Test the scaffold_generator_node."""
 
+    @pytest.fixture(scope="class")
+    def mock_llm(self):
+        """Stateless LLM stub returning the valid scaffold — shared by the class."""
+        return SimpleNamespace(ainvoke=_fake_ainvoke)
+
     @pytest.fixture
-    def mock_llm_response(self):
-        """Create a mock LLM response with valid scaffold JSON."""
-        scaffold_json = json.dumps({
-            "project_name": "task-manager-api",
-            "files": [
-                {
-                    "path": "src/main.py",
-                    "content": "from fastapi import FastAPI\napp = FastAPI()\n",
-                    "language": "python",
-                    "description": "Application entry point",
-                },
-                {
-                    "path": "README.md",
-                    "content": "# Task Manager API\n\nA RESTful task management API.",
-                    "language": "markdown",
-                    "description": "Project readme",
-                },
-                {
-                    "path": "requirements.txt",
-                    "content": "fastapi>=0.100.0\nuvicorn>=0.23.0\n",
-                    "language": "text",
-                    "description": "Python dependencies",
-                },
-            ],
-            "file_tree": "├── src/\n│   └── main.py\n├── README.md\n└── requirements.txt",
-        })
-        mock_resp = MagicMock()
-        mock_resp.content = scaffold_json
-        return mock_resp
+    def patched_get_llm(self, monkeypatch):
+        """Route ``scaffold_node.get_llm`` to a given stub for one test."""
+        def _apply(llm):
+            monkeypatch.setattr("app.agents.nodes.scaffold_node.get_llm", lambda *a, **k: llm)
+        return _apply
 
     @pytest.mark.asyncio
-    async def test_scaffold_node_success(self, mock_llm_response):
-        from app.agents.nodes.scaffold_node import scaffold_generator_node
-
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=mock_llm_response)
-
-        state = {
-            "scaffold_project_title": "Task Manager API",
-            "scaffold_project_description": "A RESTful task management API",
-            "scaffold_tech_stack": ["Python", "FastAPI"],
-            "scaffold_options": {"include_docker": True, "include_ci": True, "include_tests": True},
-            "generated_projects": [],
-            "messages": [],
-            "errors": [],
-        }
+    async def test_scaffold_node_success(self, mock_llm, patched_get_llm):
+        state = _state(
+            scaffold_project_title="Task Manager API",
+            scaffold_project_description="A RESTful task management API",
+            scaffold_tech_stack=["Python", "FastAPI"],
+            scaffold_options={"include_docker": True, "include_ci": True, "include_tests": True},
+            generated_projects=[],
+        )
 
-        with patch("app.agents.nodes.scaffold_node.get_llm", return_value=mock_llm):
-            result = await scaffold_generator_node(state)
+        patched_get_llm(mock_llm)
+        result = await scaffold_generator_node(state)
 
         assert result["current_phase"] == "scaffold_generation_complete"
         assert len(result["scaffold_files"]) == 3
@@ -206,18 +229,12 @@ class TestScaffoldNode:
         assert "main.py" in result["scaffold_file_tree"]
 
     @pytest.mark.asyncio
-    async def test_scaffold_node_with_capstone_context(self, mock_llm_response):
-        from app.agents.nodes.scaffold_node import scaffold_generator_node
-
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=mock_llm_response)
-
-        state = {
-            "scaffold_project_title": "Task Manager API",
-            "scaffold_project_description": "A RESTful task management API",
-            "scaffold_tech_stack": ["Python", "FastAPI"],
-            "scaffold_options": {},
-            "generated_projects": [
+    async def test_scaffold_node_with_capstone_context(self, mock_llm, patched_get_llm):
+        state = _state(
+            scaffold_project_title="Task Manager API",
+            scaffold_project_description="A RESTful task management API",
+            scaffold_tech_stack=["Python", "FastAPI"],
+            generated_projects=[
                 {
                     "title": "Task Manager API",
                     "architecture": {"description": "Microservice with worker queues"},
@@ -226,58 +243,34 @@ class TestScaffoldNode:
                     "recruiter_match_reasoning": "Shows distributed systems skills",
                 }
             ],
-            "messages": [],
-            "errors": [],
-        }
+        )
 
-        with patch("app.agents.nodes.scaffold_node.get_llm", return_value=mock_llm):
-            result = await scaffold_generator_node(state)
+        patched_get_llm(mock_llm)
+        result = await scaffold_generator_node(state)
 
         assert result["current_phase"] == "scaffold_generation_complete"
         assert len(result["scaffold_files"]) >= 1
 
     @pytest.mark.asyncio
-    async def test_scaffold_node_invalid_json(self):
-        from app.agents.nodes.scaffold_node import scaffold_generator_node
-
-        mock_resp = MagicMock()
-        mock_resp.content = "This is not valid JSON at all"
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=mock_resp)
-
-        state = {
-            "scaffold_project_title": "Test",
-            "scaffold_project_description": "Test description",
-            "scaffold_tech_stack": [],
-            "scaffold_options": {},
-            "messages": [],
-            "errors": [],
-        }
+    async def test_scaffold_node_invalid_json(self, patched_get_llm):
+        mock_llm = SimpleNamespace(ainvoke=_fake_ainvoke_bad_json)
+
+        state = _state(scaffold_project_description="Test description")
 
-        with patch("app.agents.nodes.scaffold_node.get_llm", return_value=mock_llm):
-            result = await scaffold_generator_node(state)
+        patched_get_llm(mock_llm)
+        result = await scaffold_generator_node(state)
 
         assert "scaffold_generation_failed" in result["current_phase"]
         assert len(result["errors"]) > 0
 
     @pytest.mark.asyncio
-    async def test_scaffold_node_llm_exception(self):
-        from app.agents.nodes.scaffold_node import scaffold_generator_node
-
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(side_effect=RuntimeError("LLM offline"))
-
-        state = {
-            "scaffold_project_title": "Test",
-            "scaffold_project_description": "Test",
-            "scaffold_tech_stack": [],
-            "scaffold_options": {},
-            "messages": [],
-            "errors": [],
-        }
+    async def test_scaffold_node_llm_exception(self, patched_get_llm):
+        mock_llm = SimpleNamespace(ainvoke=_fake_ainvoke_err)
+
+        state = _state()
 
-        with patch("app.agents.nodes.scaffold_node.get_llm", return_value=mock_llm):
-            result = await scaffold_generator_node(state)
+        patched_get_llm(mock_llm)
+        result = await scaffold_generator_node(state)
 
         assert "scaffold_generation_failed" in result["current_phase"]
         assert len(result["errors"]) > 0
@@ -287,36 +280,29 @@ class TestScaffoldNode:
 class TestScaffoldValidation:
     """Test path sanitization and content validation."""
 
-    def test_sanitize_path_valid(self):
-        from app.agents.nodes.scaffold_node import _sanitize_path
-        assert _sanitize_path("src/main.py") == "src/main.py"
-        assert _sanitize_path("README.md") == "README.md"
-        assert _sanitize_path(".gitignore") == ".gitignore"
-
-    def test_sanitize_path_traversal_blocked(self):
-        from app.agents.nodes.scaffold_node import _sanitize_path
-        assert _sanitize_path("../../etc/passwd") is None
-        assert _sanitize_path("src/../../../secret") is None
-
-    def test_sanitize_path_forbidden_dirs(self):
-        from app.agents.nodes.scaffold_node import _sanitize_path
-        assert _sanitize_path("node_modules/pkg/file.js") is None
-        assert _sanitize_path("__pycache__/module.pyc") is None
-        assert _sanitize_path(".git/config") is None
-
-    def test_sanitize_path_empty_and_long(self):
-        from app.agents.nodes.scaffold_node import _sanitize_path
-        assert _sanitize_path("") is None
-        assert _sanitize_path("a" * 400) is None
+    @pytest.mark.parametrize("raw,expected", [
+        ("src/main.py", "src/main.py"),
+        ("README.md", "README.md"),
+        (".gitignore", ".gitignore"),
+        # Traversal
+        ("../../etc/passwd", None),
+        ("src/../../../secret", None),
+        # Forbidden directories
+        ("node_modules/pkg/file.js", None),
+        ("__pycache__/module.pyc", None),
+        (".git/config", None),
+        # Empty / too long
+        ("", None),
+        ("a" * 400, None),
+    ])
+    def test_sanitize_path(self, raw, expected):
+        assert _sanitize_path(raw) == expected
 
     def test_validate_scaffold_size_limit(self):
-        from app.agents.nodes.scaffold_node import _validate_scaffold
-
-        big_content = "x" * (600 * 1024)  # 600 KB
         scaffold = {
             "project_name": "test",
             "files": [
-                {"path": "big.txt", "content": big_content, "language": "text"},
+                {"path": "big.txt", "content": _BIG_CONTENT, "language": "text"},
                 {"path": "more.txt", "content": "should be truncated", "language": "text"},
             ],
             "file_tree": "test",
@@ -326,8 +312,6 @@ class TestScaffoldValidation:
         assert len(result["files"]) <= 1
 
     def test_validate_scaffold_project_name_sanitization(self):
-        from app.agents.nodes.scaffold_node import _validate_scaffold
-
         scaffold = {
             "project_name": "My Project!! @#$",
             "files": [],
@@ -338,8 +322,6 @@ class TestScaffoldValidation:
         assert result["project_name"] == "myproject"
 
     def test_parse_scaffold_response_markdown_wrapped(self):
-        from app.agents.nodes.scaffold_node import _parse_scaffold_response
-
         wrapped = '```json\n{"project_name": "test", "files": [], "file_tree": ""}\n```'
         result = _parse_scaffold_response(wrapped)
         assert result["project_name"] == "test"
@@ -350,47 +332,57 @@ class TestScaffoldPipeline:
     """Test scaffold pipeline compilation."""
 
     def test_compile_scaffold_pipeline(self):
-        from app.agents.orchestrator import compile_scaffold_pipeline
         pipeline = compile_scaffold_pipeline()
         assert pipeline is not None
 
     def test_build_scaffold_pipeline_nodes(self):
-        from app.agents.orchestrator import build_scaffold_pipeline
         graph = build_scaffold_pipeline()
         assert "scaffold_generator" in graph.nodes
 
 # API Endpoint Tests
 
+@pytest.mark.xdist_group("scaffold_api")
 class TestScaffoldAPI:
     """Test scaffold API endpoints."""
 
-    def test_scaffold_generate_requires_auth(self, client):
-        response = client.post(
-            "/api/v1/scaffold/generate",
-            json={
-                "project_title": "Test Project",
-                "project_description": "A test project with enough text.",
-                "tech_stack": ["Python"],
-            },
-        )
-        assert response.status_code in (401, 403)
+    @pytest.fixture
+    def reject_auth(self):
+        """Short-circuit auth to a 401: the probes only check the routes are guarded."""
+        from app.main import app
 
-    def test_scaffold_list_requires_auth(self, client):
-        response = client.get("/api/v1/scaffold/")
-        assert response.status_code in (401, 403)
+        def _unauthenticated():
+            raise HTTPException(status_code=401, detail="Authentication required")
 
-    def test_scaffold_get_requires_auth(self, client):
-        response = client.get("/api/v1/scaffold/some-id")
-        assert response.status_code in (401, 403)
+        app.dependency_overrides[get_current_user] = _unauthenticated
+        yield
+        app.dependency_overrides.pop(get_current_user, None)
 
-    def test_scaffold_generate_validation(self, client):
-        """Short title should fail validation (auth first, so 401 without token)."""
-        response = client.post(
-            "/api/v1/scaffold/generate",
-            json={
+    @pytest.mark.asyncio
+    async def test_requires_auth(self, async_client, reject_auth):
+        """Auth short-circuits every probe, so they can share one loop turn."""
+        generate, listing, detail, short_title = await asyncio.gather(
+            async_client.post("/api/v1/scaffold/generate", json={
+                "project_title": "Test Project",
+                "project_description": "A test project with enough text.",
+                "tech_stack": ["Python"],
+            }),
+            async_client.get("/api/v1/scaffold/"),
+            async_client.get("/api/v1/scaffold/some-id"),
+            async_client.post("/api/v1/scaffold/generate", json={
                 "project_title": "AB",
                 "project_description": "desc",
-            },
+            }),
         )
+        for response in (generate, listing, detail):
+            assert response.status_code in (401, 403)
         # Auth check happens before validation, so 401 without token
-        assert response.status_code in (401, 422)
+        assert short_title.status_code in (401, 422)
+
+    @pytest.mark.parametrize("headers", [
+        {},  # no token
+        {"Authorization": "Bearer not-a-jwt"},  # malformed token
+    ])
+    def test_real_auth_rejects_bad_credentials(self, client, headers):
+        """No override here — the request goes through the real get_current_user."""
+        response = client.get("/api/v1/scaffold/", headers=headers)
+        assert response.status_code in (401, 403)
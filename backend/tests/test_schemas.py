@@ -13,13 +13,18 @@ from app.schemas.capstone import CapstoneGenerationRequest
 from app.schemas.scaffold import ScaffoldRequest
 from app.schemas.portfolio import PortfolioOptimizeRequest
 
+pytestmark = pytest.mark.unit
+
+_JD_OK = "x" * 100
+_JD_TOO_LONG = "x" * 20000
+
 
 class TestJDSchema:
     """Validation tests for JD analysis schemas."""
 
     def test_valid_jd_request(self):
         req = JDAnalysisRequest(
-            jd_text="x" * 100,
+            jd_text=_JD_OK,
             role="Backend Engineer",
             company_type=CompanyType.STARTUP,
         )
@@ -37,7 +42,7 @@ class TestJDSchema:
     def test_jd_text_too_long(self):
         with pytest.raises(ValidationError):
             JDAnalysisRequest(
-                jd_text="x" * 20000,
+                jd_text=_JD_TOO_LONG,
                 role="Engineer",
                 company_type=CompanyType.STARTUP,
             )
@@ -45,23 +50,23 @@ class TestJDSchema:
     def test_invalid_company_type(self):
         with pytest.raises(ValidationError):
             JDAnalysisRequest(
-                jd_text="x" * 100,
+                jd_text=_JD_OK,
                 role="Engineer",
                 company_type="google",  # type: ignore
             )
 
-    def test_all_company_types_valid(self):
-        for ct in CompanyType:
-            req = JDAnalysisRequest(
-                jd_text="x" * 100,
-                role="Engineer",
-                company_type=ct,
-            )
-            assert req.company_type == ct
+    @pytest.mark.parametrize("ct", list(CompanyType))
+    def test_all_company_types_valid(self, ct):
+        req = JDAnalysisRequest(
+            jd_text=_JD_OK,
+            role="Engineer",
+            company_type=ct,
+        )
+        assert req.company_type == ct
 
     def test_geography_optional(self):
         req = JDAnalysisRequest(
-            jd_text="x" * 100,
+            jd_text=_JD_OK,
             role="Engineer",
             company_type=CompanyType.FAANG,
         )